@@ -8,6 +8,8 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_jwt_extended.exceptions import NoAuthorizationError, InvalidHeaderError
 from .utils.email import init_mail
+from .utils.cache import init_cache
+from .utils import cache_dependencies, entity_cache
 import os
 
 from .routes.admin import admin_bp, cache_ns
@@ -36,8 +38,13 @@ def create_app(config_class=Config):
             r"/*": {
                 "origins": ["http://localhost:5173"],
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-                "allow_headers": ["Content-Type", "Authorization", "Accept"],
-                "expose_headers": ["Content-Type", "Authorization"],
+                "allow_headers": [
+                    "Content-Type",
+                    "Authorization",
+                    "Accept",
+                    "If-None-Match",
+                ],
+                "expose_headers": ["Content-Type", "Authorization", "ETag"],
                 "supports_credentials": True,
                 "max_age": 3600,
             }
@@ -48,6 +55,7 @@ def create_app(config_class=Config):
     migrate = Migrate(app, db)
     init_celery(app)
     init_mail(app)
+    init_cache(app)
 
     api = Api(
         app,
@@ -5,13 +5,28 @@ celery_app = Celery(__name__, broker="redis://localhost:6379/0")
 
 
 class ContextTask(celery_app.Task):
+    """
+    Task that runs inside the app context of the worker's Flask app
+
+    The app is the one registered by init_celery, so every task reuses it and
+    its connection pools. A worker that never created one creates it on its
+    first task.
+    """
+
     def __call__(self, *args, **kwargs):
-        with self.app.app_context():
+        flask_app = getattr(self.app, "flask_app", None)
+        if flask_app is None:
+            from app import create_app
+
+            # create_app registers itself through init_celery
+            flask_app = create_app()
+        with flask_app.app_context():
             return self.run(*args, **kwargs)
 
 
 def init_celery(app: Flask):
     celery_app.config_from_object(app.config)
+    celery_app.flask_app = app
     celery_app.set_default()
     app.extensions["celery"] = celery_app
     return celery_app
@@ -1,6 +1,14 @@
 import click
 from flask.cli import with_appcontext
-from ..utils.cache_management import clear_cache, list_cache_keys, get_cache_stats
+from ..utils.cache_management import (
+    clear_cache,
+    count_cache_keys,
+    iter_cache_keys,
+    get_cache_stats,
+    get_cache_metrics,
+    reset_cache_metrics,
+)
+from ..utils.cache_warming import warm_cache
 
 
 def register_cache_commands(app):
@@ -8,6 +16,8 @@ def register_cache_commands(app):
     app.cli.add_command(purge_cache_cmd)
     app.cli.add_command(list_cache_cmd)
     app.cli.add_command(cache_stats_cmd)
+    app.cli.add_command(cache_metrics_cmd)
+    app.cli.add_command(warm_cache_cmd)
 
 
 @click.command("purge-cache")
@@ -44,18 +54,18 @@ def purge_cache_cmd(pattern, confirm):
     flask purge-cache -y
     """
     if pattern != "*":
-        keys = list_cache_keys(pattern)
-        if not keys:
+        count = count_cache_keys(pattern)
+        if not count:
             click.echo(f"No keys found matching pattern: {pattern}")
             return
 
-        click.echo(f"Found {len(keys)} keys matching pattern: {pattern}")
-        if len(keys) <= 10:
+        click.echo(f"Found {count} keys matching pattern: {pattern}")
+        if count <= 10:
             click.echo("Keys to be purged:")
-            for key in keys:
+            for key in iter_cache_keys(pattern):
                 click.echo(f"  - {key}")
     else:
-        count = len(list_cache_keys("*"))
+        count = count_cache_keys("*")
         click.echo(f"This will purge ALL {count} keys in the Redis cache!")
 
     if not confirm:
@@ -65,6 +75,8 @@ def purge_cache_cmd(pattern, confirm):
 
     purged = clear_cache(pattern)
     click.echo(f"✅ Successfully purged {purged} keys from Redis cache.")
+    click.echo("\nTo warm the cache again:")
+    click.echo("  flask warm-cache")
 
 
 @click.command("list-cache")
@@ -99,23 +111,22 @@ def list_cache_cmd(pattern, limit):
     # List all keys with a higher limit
     flask list-cache -l 100
     """
-    keys = list_cache_keys(pattern)
-
-    if not keys:
+    # Stream keys as SCAN finds them instead of loading them all first
+    shown = 0
+    more = False
+    for key in iter_cache_keys(pattern):
+        if shown == limit:
+            more = True
+            break
+        if shown == 0:
+            click.echo(f"Keys matching pattern: {pattern}")
+        shown += 1
+        click.echo(f"  {shown}. {key}")
+
+    if not shown:
         click.echo(f"No keys found matching pattern: {pattern}")
-        return
-
-    total = len(keys)
-    displayed = min(total, limit)
-
-    click.echo(f"Found {total} keys matching pattern: {pattern}")
-    click.echo(f"Displaying {displayed} keys:")
-
-    for i, key in enumerate(keys[:limit]):
-        click.echo(f"  {i+1}. {key}")
-
-    if total > limit:
-        click.echo(f"... and {total - limit} more keys not shown")
+    elif more:
+        click.echo(f"... more keys not shown (limit {limit})")
 
 
 @click.command("cache-stats")
@@ -129,19 +140,111 @@ def cache_stats_cmd():
     \b
     flask cache-stats
     """
+    stats = get_cache_stats()
+    if not stats["available"]:
+        click.echo(f"❌ Error connecting to Redis: {stats['error']}", err=True)
+        click.echo("Make sure Redis server is running.")
+        return
+
+    click.echo("\n📊 Redis Cache Statistics 📊\n")
+    click.echo(f"  Total keys: {stats['total_keys']}")
+    click.echo(f"  Memory used: {stats['used_memory_human']}")
+    click.echo(f"  Connected clients: {stats['connected_clients']}")
+    click.echo(f"  Uptime: {stats['uptime_in_days']} days")
+
+    click.echo("\nTo purge the cache:")
+    click.echo("  flask purge-cache")
+    click.echo("\nTo list cache keys:")
+    click.echo("  flask list-cache")
+
+
+@click.command("cache-metrics")
+@click.option(
+    "--reset",
+    is_flag=True,
+    default=False,
+    help="Reset the counters after displaying them",
+)
+@with_appcontext
+def cache_metrics_cmd(reset):
+    """
+    Display cache hit ratios and latency per key prefix.
+
+    Examples:
+
+    \b
+    # Show hit ratios per endpoint
+    flask cache-metrics
+
+    \b
+    # Show them and start counting afresh
+    flask cache-metrics --reset
+    """
     try:
-        stats = get_cache_stats()
-
-        click.echo("\n📊 Redis Cache Statistics 📊\n")
-        click.echo(f"  Total keys: {stats['total_keys']}")
-        click.echo(f"  Memory used: {stats['used_memory_human']}")
-        click.echo(f"  Connected clients: {stats['connected_clients']}")
-        click.echo(f"  Uptime: {stats['uptime_in_days']} days")
-
-        click.echo("\nTo purge the cache:")
-        click.echo("  flask purge-cache")
-        click.echo("\nTo list cache keys:")
-        click.echo("  flask list-cache")
+        metrics = get_cache_metrics()
     except Exception as e:
         click.echo(f"❌ Error connecting to Redis: {str(e)}", err=True)
         click.echo("Make sure Redis server is running.")
+        return
+
+    if not metrics:
+        click.echo("No cache metrics recorded yet.")
+        return
+
+    click.echo("\n📈 Cache Metrics by Prefix 📈\n")
+    click.echo(
+        f"  {'Prefix':<45} {'Hits':>8} {'Misses':>8} {'Ratio':>7} "
+        f"{'Redis ms':>9} {'Read':>10} {'Written':>10}"
+    )
+    for row in metrics:
+        ratio = f"{row['hit_ratio']:.1%}" if row["hit_ratio"] is not None else "-"
+        redis_ms = (
+            f"{row['avg_redis_ms']:.2f}" if row["avg_redis_ms"] is not None else "-"
+        )
+        click.echo(
+            f"  {row['prefix']:<45} {row['hits']:>8} {row['misses']:>8} {ratio:>7} "
+            f"{redis_ms:>9} {row['bytes_read']:>10} {row['bytes_written']:>10}"
+        )
+
+    if reset:
+        reset_cache_metrics()
+        click.echo("\n✅ Cache metrics reset.")
+
+
+@click.command("warm-cache")
+@click.option(
+    "--users",
+    "-u",
+    type=int,
+    default=None,
+    help="Number of recently active customers and professionals to warm",
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=int,
+    default=None,
+    help="Number of requests to run at once",
+)
+@with_appcontext
+def warm_cache_cmd(users, concurrency):
+    """
+    Precompute the service catalog, admin pages and recent users' dashboards.
+
+    Examples:
+
+    \b
+    # Warm with the configured limits
+    flask warm-cache
+
+    \b
+    # Warm the 200 most recently active users, 8 requests at a time
+    flask warm-cache -u 200 -c 8
+    """
+    result = warm_cache(users, concurrency)
+    click.echo(
+        f"✅ Warmed {result['warmed']} of {result['requests']} endpoints "
+        f"in {result['seconds']}s."
+    )
+    if result["failed"]:
+        click.echo(f"⚠️  {result['failed']} requests failed; see the log.")
@@ -1,3 +1,4 @@
+import json
 import os
 
 
@@ -20,6 +21,110 @@ class Config:
     REDIS_DEFAULT_EXPIRATION = int(
         os.environ.get("REDIS_DEFAULT_EXPIRATION") or 3600
     )  # 1 hour
+    REDIS_NAMESPACE_VERSION_TTL = int(
+        os.environ.get("REDIS_NAMESPACE_VERSION_TTL") or 604800
+    )  # 7 days, must outlive every cache entry
+    REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS") or 50)
+    # Short timeouts: a slow Redis should cost a request milliseconds, not seconds
+    REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT") or 1)
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT") or 0.5)
+    REDIS_SOCKET_CONNECT_TIMEOUT = float(
+        os.environ.get("REDIS_SOCKET_CONNECT_TIMEOUT") or 0.25
+    )
+    REDIS_HEALTH_CHECK_INTERVAL = int(
+        os.environ.get("REDIS_HEALTH_CHECK_INTERVAL") or 30
+    )
+
+    # Cache storage: "redis", shared by every worker, or "memory", private to
+    # each process, for single-node deployments, tests and benchmarks
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND") or "redis"
+    CACHE_MEMORY_MAX_KEYS = int(
+        os.environ.get("CACHE_MEMORY_MAX_KEYS") or 100000
+    )  # least recently used keys are evicted past this
+
+    # Per-entity records (ent:sr:{id}, ent:user:{id}, ent:service:{id}) that
+    # list endpoints are assembled from; versioned like namespaces, so this
+    # must stay below REDIS_NAMESPACE_VERSION_TTL
+    CACHE_ENTITY_TTL = int(os.environ.get("CACHE_ENTITY_TTL") or 3600)
+
+    # How long a lookup that found nothing (404) is remembered, both by
+    # cache_result(cache_not_found=True) and for entity records
+    CACHE_NOT_FOUND_TTL = int(os.environ.get("CACHE_NOT_FOUND_TTL") or 60)
+
+    # TTL policies by cache_result prefix, as written in the decorator (e.g.
+    # "service:{service_id}"). A number replaces the decorator's expiration;
+    # a dict may set "ttl", "adaptive" and the adaptive TTL's "min" and "max".
+    # From the environment as JSON, e.g. '{"admin:roles": 86400}'
+    CACHE_TTL_POLICIES = json.loads(os.environ.get("CACHE_TTL_POLICIES") or "{}")
+
+    # Adaptive TTLs: each entry lives for the mean time between invalidations
+    # of its namespace, measured over the last window or two, and within RANGE
+    # times its TTL either way unless its policy sets "min" and "max"
+    CACHE_ADAPTIVE_TTL = os.environ.get("CACHE_ADAPTIVE_TTL", "False").lower() in [
+        "true",
+        "1",
+        "t",
+    ]
+    CACHE_ADAPTIVE_TTL_WINDOW = int(os.environ.get("CACHE_ADAPTIVE_TTL_WINDOW") or 3600)
+    CACHE_ADAPTIVE_TTL_RANGE = float(os.environ.get("CACHE_ADAPTIVE_TTL_RANGE") or 4)
+
+    # Cache warming (flask warm-cache): how many of the most recently active
+    # customers and professionals get their pages warmed, and how many
+    # requests (each holding a database connection) run at once
+    CACHE_WARM_USERS = int(os.environ.get("CACHE_WARM_USERS") or 50)
+    CACHE_WARM_CONCURRENCY = int(os.environ.get("CACHE_WARM_CONCURRENCY") or 4)
+
+    # Circuit breaker: after this many consecutive Redis failures the cache is
+    # bypassed (reads hit the database) until the reset timeout has passed
+    CACHE_BREAKER_FAILURE_THRESHOLD = int(
+        os.environ.get("CACHE_BREAKER_FAILURE_THRESHOLD") or 5
+    )
+    CACHE_BREAKER_RESET_TIMEOUT = float(
+        os.environ.get("CACHE_BREAKER_RESET_TIMEOUT") or 30
+    )  # seconds
+
+    # Stampede protection for cache_result(single_flight=True)
+    CACHE_LOCK_TIMEOUT = int(os.environ.get("CACHE_LOCK_TIMEOUT") or 10)
+    CACHE_LOCK_WAIT = float(os.environ.get("CACHE_LOCK_WAIT") or 2)
+    CACHE_STALE_GRACE = int(os.environ.get("CACHE_STALE_GRACE") or 30)
+
+    # Background refresh for cache_result(hard_expiration=...), at most one
+    # queued task per key within this window
+    CACHE_REFRESH_TIMEOUT = int(os.environ.get("CACHE_REFRESH_TIMEOUT") or 60)
+
+    # Codec for cached values: serializer "auto" (orjson if installed, else
+    # json), "json", "orjson" or "msgpack"; compression "auto" (zstd if
+    # installed, else zlib), "zstd", "zlib" or "none" above the threshold
+    CACHE_SERIALIZER = os.environ.get("CACHE_SERIALIZER") or "auto"
+    CACHE_COMPRESSION = os.environ.get("CACHE_COMPRESSION") or "auto"
+    CACHE_COMPRESSION_THRESHOLD = int(
+        os.environ.get("CACHE_COMPRESSION_THRESHOLD") or 1024
+    )  # bytes
+
+    # COUNT hint for SCAN when listing, measuring or purging cache keys
+    CACHE_SCAN_COUNT = int(os.environ.get("CACHE_SCAN_COUNT") or 1000)
+
+    # Per-prefix hit/miss/latency counters, flushed to Redis by each worker
+    CACHE_METRICS_ENABLED = os.environ.get("CACHE_METRICS_ENABLED", "True").lower() in [
+        "true",
+        "1",
+        "t",
+    ]
+    CACHE_METRICS_FLUSH_INTERVAL = float(
+        os.environ.get("CACHE_METRICS_FLUSH_INTERVAL") or 10
+    )
+
+    # In-process (L1) cache in front of Redis, per worker
+    CACHE_L1_ENABLED = os.environ.get("CACHE_L1_ENABLED", "True").lower() in [
+        "true",
+        "1",
+        "t",
+    ]
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get("CACHE_L1_MAX_ENTRIES") or 1024)
+    CACHE_L1_MAX_BYTES = int(
+        os.environ.get("CACHE_L1_MAX_BYTES") or 16 * 1024 * 1024
+    )  # 16 MB
+    CACHE_L1_TTL = int(os.environ.get("CACHE_L1_TTL") or 60)
 
     # Mail Configuration
     MAIL_SERVER = os.environ.get("MAIL_SERVER") or "smtp.gmail.com"
@@ -1,8 +1,41 @@
 from .database import db
 from datetime import datetime
+from typing import Any, Optional
+
+
+class ServiceStatus:
+    """
+    The values ServiceRequest.service_status may take
+    """
+
+    PENDING = "Pending"
+    ACCEPTED = "Accepted"
+    COMPLETED = "Completed"
+    CANCELLED = "Cancelled"
+    ALL = (PENDING, ACCEPTED, COMPLETED, CANCELLED)
+
+    @classmethod
+    def normalize(cls, value: Any) -> Optional[str]:
+        """
+        Get the canonical spelling of a status (e.g. "pending" -> "Pending"),
+        or None if it is not one
+        """
+        if not isinstance(value, str):
+            return None
+        value = value.strip().lower()
+        for status in cls.ALL:
+            if status.lower() == value:
+                return status
+        return None
 
 
 class User(db.Model):
+    # Admin user pages (keyset on date_created, id) and approval queues
+    __table_args__ = (
+        db.Index("ix_user_date_created_id", "date_created", "id"),
+        db.Index("ix_user_status", "status"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(120), nullable=False)
@@ -71,6 +104,48 @@ class Service(db.Model):
 
 
 class ServiceRequest(db.Model):
+    # Indexes for the hot filters: per-user lists (keyset on date_of_request,
+    # id), dashboard counts by status and completion-date reports. Created
+    # CONCURRENTLY on PostgreSQL by migration cffb96e799ce.
+    __table_args__ = (
+        db.Index("ix_service_request_date_id", "date_of_request", "id"),
+        db.Index(
+            "ix_service_request_customer_date_id",
+            "customer_id",
+            "date_of_request",
+            "id",
+        ),
+        db.Index(
+            "ix_service_request_professional_date_id",
+            "professional_id",
+            "date_of_request",
+            "id",
+        ),
+        db.Index(
+            "ix_service_request_professional_status",
+            "professional_id",
+            "service_status",
+        ),
+        db.Index(
+            "ix_service_request_status_completion",
+            "service_status",
+            "date_of_completion",
+        ),
+        db.Index("ix_service_request_service_id", "service_id"),
+        # Pending requests no professional has taken yet (the available list)
+        db.Index(
+            "ix_service_request_unassigned",
+            "date_of_request",
+            "id",
+            postgresql_where=db.text(
+                "professional_id IS NULL AND service_status = 'Pending'"
+            ),
+            sqlite_where=db.text(
+                "professional_id IS NULL AND service_status = 'Pending'"
+            ),
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     service_id = db.Column(db.Integer, db.ForeignKey("service.id"), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -78,7 +153,21 @@ class ServiceRequest(db.Model):
     professional_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     date_of_request = db.Column(db.DateTime, default=datetime.utcnow)
     date_of_completion = db.Column(db.DateTime)
-    service_status = db.Column(db.String(20), default="pending")
+    # Stored as VARCHAR with a CHECK constraint, so filters are plain
+    # equality on the indexed column; migration 5c1f3a9e7d20 normalized rows
+    service_status = db.Column(
+        db.Enum(
+            *ServiceStatus.ALL,
+            name="service_status",
+            native_enum=False,
+            create_constraint=True,
+            validate_strings=True,
+            length=20,
+        ),
+        nullable=False,
+        default=ServiceStatus.PENDING,
+        server_default=ServiceStatus.PENDING,
+    )
     remarks = db.Column(db.Text)
     location_pin_code = db.Column(db.String(10))
     preferred_date = db.Column(db.Date)
@@ -96,6 +185,8 @@ class ServiceRequest(db.Model):
 
 
 class Document(db.Model):
+    __table_args__ = (db.Index("ix_document_user_id", "user_id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     document_type = db.Column(
@@ -1,26 +1,35 @@
-from flask import Blueprint, request, Response, send_file
+from flask import Blueprint, request, Response, send_file, abort
 from flask_restx import Namespace, Resource, fields, marshal
 from flask_jwt_extended import jwt_required, get_jwt
 from ..models import (
+    ServiceStatus,
     User,
     Role,
     Service,
     ServiceRequest,
     Document,
 )
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from ..database import db
 from .auth import admin_required
 from datetime import datetime, timedelta
 import os
 from ..utils.cache_management import (
     get_cache_stats,
-    list_cache_keys,
+    scan_cache_keys,
     get_key_info,
     clear_cache,
-    get_cache_usage_by_prefix,
+    get_cache_usage,
+    get_cache_metrics,
+    reset_cache_metrics,
 )
-from ..utils.cache import cache_result, delete_pattern
+from ..utils.cache import cache_result, etag_response
+from ..utils.entity_cache import (
+    compose_service_requests,
+    get_service_request,
+    service_request_page,
+)
+from ..utils.pagination import PAGE_PARAMS, keyset_page, page_args, page_response
 
 admin_bp = Namespace("admin", description="Admin operations")
 
@@ -163,14 +172,33 @@ class CacheStats(Resource):
         return get_cache_stats()
 
 
+@cache_ns.route("/metrics")
+class CacheMetrics(Resource):
+    @admin_required()
+    def get(self):
+        """Get hit ratios, latency and payload sizes per cache prefix (Admin only)"""
+        return {"metrics": get_cache_metrics()}
+
+    @admin_required()
+    def delete(self):
+        """Reset the cache metrics (Admin only)"""
+        return {"deleted_count": reset_cache_metrics()}
+
+
 @cache_ns.route("/keys")
 class CacheKeys(Resource):
     @admin_required()
     @cache_ns.param("pattern", 'Key pattern to filter (e.g. "service:*")', default="*")
+    @cache_ns.param("cursor", "Cursor returned by the previous page", default=0)
+    @cache_ns.param("limit", "Number of keys per page (max 1000)", default=100)
     def get(self):
-        """List cache keys with optional pattern filter (Admin only)"""
+        """List cache keys with optional pattern filter, one page at a time (Admin only)"""
         pattern = request.args.get("pattern", "*")
-        return {"keys": list_cache_keys(pattern)}
+        cursor = request.args.get("cursor", 0, type=int)
+        limit = min(max(request.args.get("limit", 100, type=int), 1), 1000)
+        keys, next_cursor = scan_cache_keys(pattern, cursor, limit)
+        # A cursor of 0 means the scan is complete
+        return {"keys": keys, "cursor": next_cursor}
 
 
 @cache_ns.route("/key/<string:key>")
@@ -200,26 +228,49 @@ class CacheClear(Resource):
         return {"deleted_count": deleted_count}
 
 
+@cache_ns.route("/warm")
+class CacheWarm(Resource):
+    @admin_required()
+    @cache_ns.param("users", "Recently active users to warm (default from config)")
+    def post(self):
+        """Precompute cached endpoints in the background (Admin only)"""
+        from ..tasks.cache_tasks import warm_cache_task
+
+        users = request.args.get("users", type=int)
+        warm_cache_task.delay(users)
+        return {"message": "Cache warming started"}, 202
+
+
 @cache_ns.route("/usage")
 class CacheUsage(Resource):
     @admin_required()
+    @cache_ns.param("sample_size", "Keys sampled per prefix (max 1000)", default=50)
+    @cache_ns.param("top", "Number of largest keys to list (max 100)", default=10)
     def get(self):
-        """Get cache usage statistics grouped by prefix (Admin only)"""
-        return {"usage_by_prefix": get_cache_usage_by_prefix()}
+        """Get estimated cache memory use, TTLs and largest keys by prefix (Admin only)"""
+        sample_size = min(max(request.args.get("sample_size", 50, type=int), 1), 1000)
+        top = min(max(request.args.get("top", 10, type=int), 0), 100)
+        return get_cache_usage(sample_size, top)
 
 
 @admin_bp.route("/users")
 class UserList(Resource):
-    @admin_bp.marshal_list_with(user_model)
+    @admin_bp.doc(params=PAGE_PARAMS)
+    @admin_bp.response(200, "Success", [user_model])
     @admin_required()
     def get(self):
         """List all users."""
-        # Clear cache for this endpoint to ensure fresh data
-        delete_pattern("admin:users")
-
-        # Use joinedload to eagerly load the roles relationship
-        users = User.query.options(joinedload(User.roles)).all()
-        return users
+        cursor, limit = page_args()
+        if limit is None:
+            # Use joinedload to eagerly load the roles relationship
+            users = User.query.options(joinedload(User.roles)).all()
+            return page_response(users, user_model, None, None)
+        # selectinload keeps LIMIT on users rather than on users x roles
+        query = User.query.options(selectinload(User.roles))
+        users, next_cursor = keyset_page(
+            query, User.date_created, User.id, cursor, limit
+        )
+        return page_response(users, user_model, limit, next_cursor)
 
 
 @admin_bp.route("/users/<int:user_id>")
@@ -229,11 +280,6 @@ class UserDetail(Resource):
     @admin_required()
     def get(self, user_id):
         """Get details of a specific user."""
-        # Clear cache for this specific user
-        from ..utils.cache import delete_cache, delete_pattern
-
-        delete_pattern(f"admin:user:{user_id}")
-
         # Use joinedload to eagerly load the roles relationship
         user = User.query.options(joinedload(User.roles)).get_or_404(user_id)
         return user
@@ -241,9 +287,9 @@ class UserDetail(Resource):
 
 @admin_bp.route("/roles")
 class RoleList(Resource):
-    @admin_bp.marshal_list_with(role_model)
     @admin_required()
-    @cache_result("admin:roles", expiration=3600)
+    @cache_result("admin:roles", expiration=3600, local=True, response=True)
+    @admin_bp.marshal_list_with(role_model)
     def get(self):
         """List all roles."""
         return Role.query.all()
@@ -251,10 +297,16 @@ class RoleList(Resource):
 
 @admin_bp.route("/roles/<int:role_id>")
 class RoleDetail(Resource):
-    @admin_bp.marshal_with(role_model)
     @admin_bp.response(404, "Role not found")
     @admin_required()
-    @cache_result("admin:role", expiration=3600, args_as_key=True)
+    @cache_result(
+        "admin:role:{role_id}",
+        expiration=3600,
+        local=True,
+        response=True,
+        cache_not_found=True,
+    )
+    @admin_bp.marshal_with(role_model)
     def get(self, role_id):
         """Get details of a specific role."""
         role = Role.query.get_or_404(role_id)
@@ -263,9 +315,9 @@ class RoleDetail(Resource):
 
 @admin_bp.route("/services")
 class AdminServiceList(Resource):
-    @admin_bp.marshal_list_with(service_model)
     @admin_required()
-    @cache_result("admin:services", expiration=600)
+    @cache_result("admin:services", expiration=600, local=True, response=True)
+    @admin_bp.marshal_list_with(service_model)
     def get(self):
         """List all services."""
         return Service.query.all()
@@ -273,10 +325,16 @@ class AdminServiceList(Resource):
 
 @admin_bp.route("/services/<int:service_id>")
 class AdminServiceDetail(Resource):
-    @admin_bp.marshal_with(service_model)
     @admin_bp.response(404, "Service not found")
     @admin_required()
-    @cache_result("admin:service", expiration=600, args_as_key=True)
+    @cache_result(
+        "admin:service:{service_id}",
+        expiration=600,
+        local=True,
+        response=True,
+        cache_not_found=True,
+    )
+    @admin_bp.marshal_with(service_model)
     def get(self, service_id):
         """Get details of a specific service."""
         service = Service.query.get_or_404(service_id)
@@ -285,27 +343,41 @@ class AdminServiceDetail(Resource):
 
 @admin_bp.route("/requests")
 class AdminRequestList(Resource):
-    @admin_bp.marshal_list_with(service_request_model)
     @admin_required()
-    @cache_result("admin:requests", expiration=300)
+    @admin_bp.doc(params=PAGE_PARAMS)
+    @admin_bp.response(200, "Success", [service_request_model])
+    @etag_response
     def get(self):
         """List all service requests."""
-        return ServiceRequest.query.options(
-            joinedload(ServiceRequest.customer),
-            joinedload(ServiceRequest.professional),
-            joinedload(ServiceRequest.service),
-        ).all()
+        cursor, limit = page_args()
+        refs, next_cursor = _all_request_page(cursor, limit)
+        return page_response(
+            compose_service_requests(refs), service_request_model, limit, next_cursor
+        )
+
+
+@cache_result(
+    "admin:requests",
+    expiration=300,
+    args_as_key=True,
+    single_flight=True,
+    early_expiration=1.0,
+)
+def _all_request_page(cursor, limit):
+    return service_request_page([], cursor, limit)
 
 
 @admin_bp.route("/requests/<int:request_id>")
 class AdminRequestDetail(Resource):
-    @admin_bp.marshal_with(service_request_model)
     @admin_bp.response(404, "Request not found")
     @admin_required()
-    @cache_result("admin:request", expiration=300, args_as_key=True)
+    @etag_response
+    @admin_bp.marshal_with(service_request_model)
     def get(self, request_id):
         """Get details of a specific service request."""
-        request = ServiceRequest.query.get_or_404(request_id)
+        request = get_service_request(request_id)
+        if request is None:
+            abort(404)
         return request
 
 
@@ -317,7 +389,7 @@ class RequestStatusUpdate(Resource):
             {
                 "status": fields.String(
                     required=True,
-                    enum=["Pending", "Accepted", "Completed", "Cancelled"],
+                    enum=list(ServiceStatus.ALL),
                 )
             },
         )
@@ -327,33 +399,30 @@ class RequestStatusUpdate(Resource):
     @admin_required()
     def patch(self, request_id):
         """Update service request status."""
-        request = ServiceRequest.query.get_or_404(request_id)
+        service_request = ServiceRequest.query.get_or_404(request_id)
         data = request.get_json()
-        request.service_status = data.get("status", request.service_status)
+        if not isinstance(data, dict):
+            abort(400, "Data must be a JSON object")
+        if "status" in data:
+            status = ServiceStatus.normalize(data["status"])
+            if status is None:
+                abort(400, f"Status must be one of {', '.join(ServiceStatus.ALL)}")
+            service_request.service_status = status
         db.session.commit()
 
-        delete_pattern(f"admin:request:{request_id}")
-        delete_pattern("admin:requests")
-        delete_pattern("admin:dashboard:stats")
-
-        if request.customer_id:
-            delete_pattern(f"customer:requests:{request.customer_id}")
-            delete_pattern(f"customer:request:{request_id}")
-            delete_pattern(f"customer:activity:{request.customer_id}")
-
-        if request.professional_id:
-            delete_pattern(f"professional:requests:assigned:{request.professional_id}")
-            delete_pattern(f"professional:request:{request_id}")
-            delete_pattern(f"professional:dashboard:stats:{request.professional_id}")
-            delete_pattern(f"professional:dashboard:activity:{request.professional_id}")
-
-        return request
+        return service_request
 
 
 @admin_bp.route("/dashboard/stats")
 class DashboardStats(Resource):
     @admin_required()
-    @cache_result("admin:dashboard:stats", expiration=300)
+    @cache_result(
+        "admin:dashboard:stats",
+        expiration=60,
+        hard_expiration=600,
+        single_flight=True,
+        response=True,
+    )
     def get(self):
         """Get dashboard statistics."""
         stats = {
@@ -365,13 +434,13 @@ class DashboardStats(Resource):
             ).count(),
             "active_services": Service.query.count(),
             "pending_requests": ServiceRequest.query.filter_by(
-                service_status="Pending"
+                service_status=ServiceStatus.PENDING
             ).count(),
             "accepted_requests": ServiceRequest.query.filter_by(
-                service_status="Accepted"
+                service_status=ServiceStatus.ACCEPTED
             ).count(),
             "completed_services": ServiceRequest.query.filter_by(
-                service_status="Completed"
+                service_status=ServiceStatus.COMPLETED
             ).count(),
             "recent_activity": [
                 {
@@ -462,22 +531,8 @@ class UserStatusUpdate(Resource):
                 if not isinstance(blocked, bool):
                     return {"message": "Blocked must be a boolean value"}, 400
                 user.blocked = blocked
-
             db.session.commit()
 
-            # Invalidate caches
-            delete_pattern(f"admin:user:{user_id}")
-            delete_pattern("admin:users")
-
-            # Invalidate user-specific caches based on role
-            for role in user.roles:
-                if role.name == "professional":
-                    delete_pattern(f"professional:profile:{user_id}")
-                    delete_pattern(f"professional:requests")
-                elif role.name == "customer":
-                    delete_pattern(f"customer:profile:{user_id}")
-                    delete_pattern(f"customer:requests")
-
             return user
         except Exception as e:
             db.session.rollback()
@@ -530,9 +585,9 @@ class Reports(Resource):
                         "cancelled": 0,
                     }
                 service_requests[month]["requested"] += 1
-                if service_request.service_status == "Completed":
+                if service_request.service_status == ServiceStatus.COMPLETED:
                     service_requests[month]["completed"] += 1
-                elif service_request.service_status == "Cancelled":
+                elif service_request.service_status == ServiceStatus.CANCELLED:
                     service_requests[month]["cancelled"] += 1
 
             # Get service type distribution
@@ -571,12 +626,14 @@ class Reports(Resource):
 
             completed_services = ServiceRequest.query.filter(
                 ServiceRequest.professional_id.in_([p.id for p in professionals]),
-                ServiceRequest.status == "Completed",
+                ServiceRequest.service_status == ServiceStatus.COMPLETED,
             ).count()
 
             active_services = ServiceRequest.query.filter(
                 ServiceRequest.professional_id.in_([p.id for p in professionals]),
-                ServiceRequest.status.in_(["Pending", "Approved"]),
+                ServiceRequest.service_status.in_(
+                    [ServiceStatus.PENDING, ServiceStatus.ACCEPTED]
+                ),
             ).count()
 
             return {
@@ -606,10 +663,16 @@ class Reports(Resource):
                 )
 
                 total_requests = len(requests)
-                completed = sum(1 for r in requests if r.service_status == "Completed")
-                cancelled = sum(1 for r in requests if r.service_status == "Cancelled")
+                completed = sum(
+                    1 for r in requests if r.service_status == ServiceStatus.COMPLETED
+                )
+                cancelled = sum(
+                    1 for r in requests if r.service_status == ServiceStatus.CANCELLED
+                )
                 total_spent = sum(
-                    r.service.price for r in requests if r.service_status == "Completed"
+                    r.service.price
+                    for r in requests
+                    if r.service_status == ServiceStatus.COMPLETED
                 )
                 last_request = max((r.date_of_request for r in requests), default=None)
 
@@ -738,9 +801,9 @@ class ExportReport(Resource):
                         "cancelled": 0,
                     }
                 service_requests[month]["requested"] += 1
-                if service_request.service_status == "Completed":
+                if service_request.service_status == ServiceStatus.COMPLETED:
                     service_requests[month]["completed"] += 1
-                elif service_request.service_status == "Cancelled":
+                elif service_request.service_status == ServiceStatus.CANCELLED:
                     service_requests[month]["cancelled"] += 1
 
             service_types = {}
@@ -791,10 +854,16 @@ class ExportReport(Resource):
                 )
 
                 total_requests = len(requests)
-                completed = sum(1 for r in requests if r.service_status == "Completed")
-                cancelled = sum(1 for r in requests if r.service_status == "Cancelled")
+                completed = sum(
+                    1 for r in requests if r.service_status == ServiceStatus.COMPLETED
+                )
+                cancelled = sum(
+                    1 for r in requests if r.service_status == ServiceStatus.CANCELLED
+                )
                 total_spent = sum(
-                    r.service.price for r in requests if r.service_status == "Completed"
+                    r.service.price
+                    for r in requests
+                    if r.service_status == ServiceStatus.COMPLETED
                 )
                 last_request = max((r.date_of_request for r in requests), default=None)
 
@@ -825,10 +894,10 @@ class ExportReport(Resource):
 
 @admin_bp.route("/users/<int:user_id>/documents")
 class UserDocuments(Resource):
-    @admin_bp.marshal_list_with(document_model)
     @admin_bp.doc(description="Get all documents for a user")
     @admin_required()
-    @cache_result("admin:user:documents", expiration=600, args_as_key=True)
+    @cache_result("admin:user:documents:{user_id}", expiration=600, response=True)
+    @admin_bp.marshal_list_with(document_model)
     def get(self, user_id):
         """Get all documents for a user."""
         user = User.query.get_or_404(user_id)
@@ -852,18 +921,8 @@ class VerifyDocument(Resource):
         user = User.query.get(document.user_id)
         if user and not user.profile_docs_verified:
             user.profile_docs_verified = True
-
         db.session.commit()
 
-        delete_pattern(f"admin:user:{document.user_id}")
-        delete_pattern("admin:users")
-        delete_pattern(f"admin:user:documents:{document.user_id}")
-
-        professional = Professional.query.filter_by(user_id=document.user_id).first()
-        if professional:
-            delete_pattern(f"professional:profile:{document.user_id}")
-            delete_pattern(f"professional:documents:{document.user_id}")
-
         return document
 
 
@@ -890,18 +949,8 @@ class RejectDocument(Resource):
         document.verified = False
         document.rejected = True
         document.rejection_reason = data.get("reason")
-
         db.session.commit()
 
-        delete_pattern(f"admin:user:{document.user_id}")
-        delete_pattern("admin:users")
-        delete_pattern(f"admin:user:documents:{document.user_id}")
-
-        professional = Professional.query.filter_by(user_id=document.user_id).first()
-        if professional:
-            delete_pattern(f"professional:profile:{document.user_id}")
-            delete_pattern(f"professional:documents:{document.user_id}")
-
         return document
 
 
@@ -20,10 +20,12 @@ from ..tasks.email_tasks import (
     send_test_email_task,
 )
 import os
+from functools import wraps
 
 
 def admin_required():
     def wrapper(fn):
+        @wraps(fn)
         @jwt_required()
         def decorator(*args, **kwargs):
             # Skip admin check for OPTIONS requests
@@ -42,6 +44,7 @@ def admin_required():
 
 def professional_required():
     def wrapper(fn):
+        @wraps(fn)
         @jwt_required()
         def decorator(*args, **kwargs):
             claims = get_jwt()
@@ -67,6 +70,7 @@ def professional_required():
 
 def customer_required():
     def wrapper(fn):
+        @wraps(fn)
         @jwt_required()
         def decorator(*args, **kwargs):
             claims = get_jwt()
@@ -1,14 +1,19 @@
-from flask import Blueprint, request, current_app, send_file
+from flask import Blueprint, request, current_app, send_file, abort
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy.orm import joinedload
-from ..models import Service, ServiceRequest, User, Document
+from ..models import Service, ServiceRequest, ServiceStatus, User, Document
 from ..database import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from .service import service_model
 from .auth import customer_required
-from ..utils.cache import cache_result, delete_pattern
+from ..utils.cache import cache_result, etag_response
+from ..utils.entity_cache import (
+    compose_service_requests,
+    get_service_request,
+    service_request_page,
+)
+from ..utils.pagination import PAGE_PARAMS, page_args, page_response
 from ..tasks.email_tasks import send_notification_email_task
 import os
 from datetime import datetime
@@ -116,20 +121,6 @@ class CustomerRequests(Resource):
         db.session.add(new_request)
         db.session.commit()
 
-        # Invalidate customer cache
-        delete_pattern("customer:requests:*")
-        delete_pattern("customer:request:*")
-        delete_pattern("customer:stats:*")
-        delete_pattern("customer:activity:*")
-
-        # Invalidate admin cache
-        delete_pattern("admin:requests:*")
-        delete_pattern("admin:dashboard:stats:*")
-
-        # Invalidate professional cache for available requests
-        delete_pattern("professional:requests:*")
-        delete_pattern("professional:requests:available:*")
-
         # Send confirmation email to the customer
         customer = User.query.get(customer_id)
         if customer and customer.email:
@@ -145,34 +136,38 @@ class CustomerRequests(Resource):
         return new_request, 201
 
     @jwt_required()
-    @customer_bp.marshal_list_with(service_request_model)
-    @cache_result("customer:requests", expiration=300, args_as_key=True)
+    @customer_bp.doc(params=PAGE_PARAMS)
+    @customer_bp.response(200, "Success", [service_request_model])
+    @etag_response
     def get(self):
         """List all service requests for the logged-in customer."""
-        customer_id = get_jwt_identity()
-        return (
-            ServiceRequest.query.filter_by(customer_id=customer_id)
-            .options(
-                joinedload(ServiceRequest.customer),
-                joinedload(ServiceRequest.service),
-                joinedload(ServiceRequest.professional),
-            )
-            .all()
+        cursor, limit = page_args()
+        refs, next_cursor = _customer_request_page(cursor, limit)
+        return page_response(
+            compose_service_requests(refs), service_request_model, limit, next_cursor
         )
 
 
+@cache_result("customer:requests:{identity}", expiration=300, args_as_key=True)
+def _customer_request_page(cursor, limit):
+    customer_id = get_jwt_identity()
+    return service_request_page(
+        [ServiceRequest.customer_id == customer_id], cursor, limit
+    )
+
+
 @customer_bp.route("/requests/<int:request_id>")
 class CustomerRequestDetail(Resource):
+    @customer_bp.response(404, "Request not found")
     @jwt_required()
+    @etag_response
     @customer_bp.marshal_with(service_request_model)
-    @customer_bp.response(404, "Request not found")
-    @cache_result("customer:request", expiration=300, args_as_key=True)
     def get(self, request_id):
         """Get details of a specific service request for the logged-in customer."""
         customer_id = get_jwt_identity()
-        request = ServiceRequest.query.filter_by(
-            id=request_id, customer_id=customer_id
-        ).first_or_404()
+        request = get_service_request(request_id)
+        if request is None or str(request.customer_id) != str(customer_id):
+            abort(404)
         return request
 
 
@@ -195,7 +190,10 @@ class TakeActionOnRequest(Resource):
 
         if action == "cancel":
             # Only allow cancellation if the request is not already completed
-            if service_request.service_status in ["Completed", "Cancelled"]:
+            if service_request.service_status in (
+                ServiceStatus.COMPLETED,
+                ServiceStatus.CANCELLED,
+            ):
                 return (
                     customer_bp.marshal(
                         {
@@ -206,26 +204,10 @@ class TakeActionOnRequest(Resource):
                     400,
                 )
 
-            service_request.service_status = "Cancelled"
+            service_request.service_status = ServiceStatus.CANCELLED
             db.session.commit()
 
-            delete_pattern("customer:requests:*")
-            delete_pattern("customer:request:*")
-            delete_pattern("customer:stats:*")
-            delete_pattern("customer:activity:*")
-            delete_pattern(
-                "professional:requests:*"
-            )  # Invalidate main professional requests cache
-            delete_pattern(
-                "professional:requests:available:*"
-            )  # Invalidate available requests cache
-
             if service_request.professional_id:
-                delete_pattern("professional:requests:assigned:*")
-                delete_pattern("professional:request:*")
-                delete_pattern("professional:dashboard:stats:*")
-                delete_pattern("professional:dashboard:activity:*")
-
                 # Notify the professional if one was assigned
                 professional = User.query.get(service_request.professional_id)
                 if professional and professional.email:
@@ -299,10 +281,10 @@ activity_item_model = customer_bp.model(
 
 @customer_bp.route("/dashboard/activity")
 class CustomerActivityFeed(Resource):
+    @customer_bp.doc(description="Get activity feed for the logged-in customer.")
     @jwt_required()
+    @cache_result("customer:activity:{identity}", expiration=300, response=True)
     @customer_bp.marshal_list_with(activity_item_model)
-    @customer_bp.doc(description="Get activity feed for the logged-in customer.")
-    @cache_result("customer:activity:{identity}", expiration=300)
     def get(self):
         """Get activity feed for the logged-in customer."""
         from sqlalchemy import desc
@@ -323,13 +305,13 @@ class CustomerActivityFeed(Resource):
         for req in service_requests:
             # Determine action based on status
             action = ""
-            if req.service_status == "Pending":
+            if req.service_status == ServiceStatus.PENDING:
                 action = "created"
-            elif req.service_status == "Completed":
+            elif req.service_status == ServiceStatus.COMPLETED:
                 action = "completed"
-            elif req.service_status == "Cancelled":
+            elif req.service_status == ServiceStatus.CANCELLED:
                 action = "canceled"
-            elif req.service_status == "Accepted":
+            elif req.service_status == ServiceStatus.ACCEPTED:
                 action = "accepted"
 
             activity_feed.append(
@@ -345,7 +327,7 @@ class CustomerActivityFeed(Resource):
             )
 
             # If completed, add a payment activity
-            if req.service_status == "Completed" and req.service.price:
+            if req.service_status == ServiceStatus.COMPLETED and req.service.price:
                 activity_feed.append(
                     {
                         "id": f"payment-{req.id}",
@@ -366,10 +348,10 @@ class CustomerActivityFeed(Resource):
 
 @customer_bp.route("/profile")
 class CustomerProfile(Resource):
-    @customer_bp.marshal_with(user_details_model)
     @customer_bp.doc(description="Get customer profile")
     @customer_required()
-    @cache_result("customer:profile:{identity}", expiration=600)
+    @cache_result("customer:profile:{identity}", expiration=600, response=True)
+    @customer_bp.marshal_with(user_details_model)
     def get(self):
         """Get customer profile."""
         customer_id = get_jwt_identity()
@@ -395,13 +377,8 @@ class CustomerProfile(Resource):
         for field in allowed_fields:
             if field in data:
                 setattr(customer, field, data[field])
-
         db.session.commit()
 
-        delete_pattern("customer:profile:*")
-        delete_pattern(f"customer:stats:*")
-        delete_pattern(f"customer:activity:*")
-
         return customer
 
 
@@ -427,9 +404,6 @@ class CustomerPassword(Resource):
         user.password = generate_password_hash(new_password)
         db.session.commit()
 
-        # Invalidate relevant caches
-        delete_pattern("customer:profile:*")
-
         return {"message": "Password updated successfully"}, 200
 
 
@@ -498,9 +472,6 @@ class CustomerProfilePicture(Resource):
             user.profile_image = filename
             db.session.commit()
 
-            # Invalidate profile cache
-            delete_pattern("customer:profile:*")
-
             return {"message": "Profile picture updated successfully"}, 200
 
         return {"message": "Invalid file type"}, 400
@@ -530,58 +501,59 @@ class CustomerAccount(Resource):
         db.session.delete(user)
         db.session.commit()
 
-        # Invalidate all customer-related caches
-        delete_pattern("customer:*")
-
         return {"message": "Account deleted successfully"}, 200
 
 
 @customer_bp.route("/dashboard/stats")
 class CustomerDashboardStats(Resource):
-    @jwt_required()
     @customer_bp.doc(description="Get stats for customer dashboard")
+    @jwt_required()
     @customer_required()
-    @cache_result("customer:stats:{identity}", expiration=300)
+    @cache_result(
+        "customer:stats:{identity}",
+        expiration=60,
+        hard_expiration=600,
+        response=True,
+    )
     def get(self):
         """Get statistics for the customer dashboard."""
         customer_id = get_jwt_identity()
 
-        # Get all service requests for the customer
-        service_requests = ServiceRequest.query.filter_by(customer_id=customer_id).all()
-
-        total_requests = len(service_requests)
-        completed_requests = len(
-            [r for r in service_requests if r.service_status.lower() == "completed"]
-        )
-        pending_requests = len(
-            [r for r in service_requests if r.service_status.lower() == "pending"]
-        )
-        accepted_requests = len(
-            [r for r in service_requests if r.service_status.lower() == "accepted"]
-        )
-        cancelled_requests = len(
-            [r for r in service_requests if r.service_status.lower() == "cancelled"]
-        )
-
-        # Calculate money spent on completed services
-        total_spent = 0
-        for request in service_requests:
-            if request.service_status.lower() == "completed":
-                service = Service.query.get(request.service_id)
-                if service:
-                    total_spent += service.price
-
-        # Get services by category
-        services_data = (
-            db.session.query(Service.name, db.func.count(ServiceRequest.id))
-            .join(ServiceRequest, ServiceRequest.service_id == Service.id)
+        # One grouped query: requests and their total price per service and
+        # status; every figure below is folded from its few rows, so the cost
+        # does not grow with the customer's history
+        rows = (
+            db.session.query(
+                Service.name,
+                ServiceRequest.service_status,
+                db.func.count(ServiceRequest.id),
+                db.func.sum(Service.price),
+            )
+            .join(Service, ServiceRequest.service_id == Service.id)
             .filter(ServiceRequest.customer_id == customer_id)
-            .group_by(Service.name)
+            .group_by(Service.name, ServiceRequest.service_status)
+            .order_by(Service.name)
             .all()
         )
 
+        status_counts = dict.fromkeys(ServiceStatus.ALL, 0)
+        category_counts = {}
+        total_spent = 0
+        for name, status, count, price in rows:
+            status_counts[status] += count
+            category_counts[name] = category_counts.get(name, 0) + count
+            if status == ServiceStatus.COMPLETED:
+                # Money spent on completed services
+                total_spent += price or 0
+
+        total_requests = sum(status_counts.values())
+        completed_requests = status_counts[ServiceStatus.COMPLETED]
+        pending_requests = status_counts[ServiceStatus.PENDING]
+        accepted_requests = status_counts[ServiceStatus.ACCEPTED]
+        cancelled_requests = status_counts[ServiceStatus.CANCELLED]
+
         services_by_category = [
-            {"name": name, "count": count} for name, count in services_data
+            {"name": name, "count": count} for name, count in category_counts.items()
         ]
 
         # Return stats
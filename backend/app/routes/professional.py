@@ -1,7 +1,7 @@
-from flask import Blueprint, request, current_app, send_file
+from flask import Blueprint, request, current_app, send_file, abort
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models import ServiceRequest, User, Service, Document, Role
+from ..models import ServiceRequest, ServiceStatus, User, Service, Document, Role
 from ..database import db
 from .auth import professional_required
 from datetime import datetime, timedelta
@@ -10,8 +10,14 @@ from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 import os
 from werkzeug.security import check_password_hash, generate_password_hash
-from sqlalchemy import func, desc
-from ..utils.cache import cache_result, delete_pattern
+from sqlalchemy import case, func, desc, literal
+from ..utils.cache import cache_result, etag_response
+from ..utils.entity_cache import (
+    compose_service_requests,
+    get_service_request,
+    service_request_page,
+)
+from ..utils.pagination import PAGE_PARAMS, page_args, page_response
 from ..tasks.email_tasks import send_notification_email_task
 
 professional_bp = Namespace(
@@ -139,67 +145,81 @@ activity_item_model = professional_bp.model(
 
 @professional_bp.route("/requests")
 class ProfessionalRequests(Resource):
-    @professional_bp.marshal_list_with(service_request_with_details_model)
     @professional_bp.doc(description="List all available service requests.")
     @professional_required()
-    @cache_result("professional:requests:available", expiration=300)
+    @professional_bp.doc(params=PAGE_PARAMS)
+    @professional_bp.response(200, "Success", [service_request_with_details_model])
+    @etag_response
     def get(self):
         """List all available service requests."""
-
-        requests = (
-            ServiceRequest.query.filter_by(professional_id=None)
-            .options(
-                joinedload(ServiceRequest.customer),
-                joinedload(ServiceRequest.service),
-            )
-            .all()
+        cursor, limit = page_args()
+        refs, next_cursor = _available_request_page(cursor, limit)
+        return page_response(
+            compose_service_requests(refs),
+            service_request_with_details_model,
+            limit,
+            next_cursor,
         )
-        return requests
+
+
+# Pending requests no professional has accepted yet. The status is inlined
+# rather than bound, or the partial index ix_service_request_unassigned, whose
+# predicate names it, could not be planned for the query.
+AVAILABLE_REQUESTS = (
+    ServiceRequest.professional_id.is_(None),
+    ServiceRequest.service_status
+    == literal(ServiceStatus.PENDING, literal_execute=True),
+)
+
+
+@cache_result("professional:requests:available", expiration=300, args_as_key=True)
+def _available_request_page(cursor, limit):
+    return service_request_page(AVAILABLE_REQUESTS, cursor, limit)
 
 
 @professional_bp.route("/requests/assigned")
 class AssignedProfessionalRequests(Resource):
-    @professional_bp.marshal_list_with(service_request_with_details_model)
     @professional_bp.doc(
         description="List all service requests assigned to the logged-in professional."
     )
     @professional_required()
-    @cache_result("professional:requests:assigned", expiration=300, args_as_key=True)
+    @professional_bp.doc(params=PAGE_PARAMS)
+    @professional_bp.response(200, "Success", [service_request_with_details_model])
+    @etag_response
     def get(self):
         """List all service requests assigned to the logged-in professional."""
-        professional_id = get_jwt_identity()
-        return (
-            ServiceRequest.query.filter_by(professional_id=professional_id)
-            .options(
-                joinedload(ServiceRequest.customer),
-                joinedload(ServiceRequest.professional),
-                joinedload(ServiceRequest.service),
-            )
-            .all()
+        cursor, limit = page_args()
+        refs, next_cursor = _assigned_request_page(cursor, limit)
+        return page_response(
+            compose_service_requests(refs),
+            service_request_with_details_model,
+            limit,
+            next_cursor,
         )
 
 
+@cache_result(
+    "professional:requests:assigned:{identity}", expiration=300, args_as_key=True
+)
+def _assigned_request_page(cursor, limit):
+    professional_id = get_jwt_identity()
+    return service_request_page(
+        [ServiceRequest.professional_id == professional_id], cursor, limit
+    )
+
+
 @professional_bp.route("/requests/<int:request_id>")
 class ProfessionalRequestDetail(Resource):
     @professional_bp.response(404, "Request not found")
     @professional_bp.doc(description="Get details of a specific service request.")
-    @professional_bp.marshal_with(service_request_with_details_model)
     @professional_required()
-    @cache_result("professional:request", expiration=300, args_as_key=True)
+    @etag_response
+    @professional_bp.marshal_with(service_request_with_details_model)
     def get(self, request_id):
         """Get details of a specific service request."""
-        professional_id = get_jwt_identity()
-        request = (
-            ServiceRequest.query.filter_by(
-                id=request_id,
-            )
-            .options(
-                joinedload(ServiceRequest.customer),
-                joinedload(ServiceRequest.professional),
-                joinedload(ServiceRequest.service),
-            )
-            .first_or_404()
-        )
+        request = get_service_request(request_id)
+        if request is None:
+            abort(404)
         return request
 
 
@@ -232,21 +252,9 @@ class TakeActionOnRequest(Resource):
                 )
 
             service_request.professional_id = professional_id
-            service_request.service_status = "Accepted"
+            service_request.service_status = ServiceStatus.ACCEPTED
             db.session.commit()
 
-            delete_pattern("professional:requests:available")
-            delete_pattern(
-                "professional:requests"
-            )  # Invalidate main professional requests cache
-            delete_pattern(f"professional:requests:assigned:{professional_id}")
-            delete_pattern(f"professional:request:{request_id}")
-            delete_pattern(f"professional:dashboard:stats:{professional_id}")
-            delete_pattern(f"professional:dashboard:activity:{professional_id}")
-            delete_pattern(f"customer:requests:{service_request.customer_id}")
-            delete_pattern(f"customer:request:{request_id}")
-            delete_pattern(f"customer:activity:{service_request.customer_id}")
-
             # Notify the customer that a professional has accepted their request
             customer = User.query.get(service_request.customer_id)
             if customer and customer.email:
@@ -290,7 +298,7 @@ class TakeActionOnRequest(Resource):
                 )
 
             # Only allow completion if the request is in accepted status
-            if service_request.service_status.lower() != "accepted":
+            if service_request.service_status != ServiceStatus.ACCEPTED:
                 return (
                     professional_bp.marshal(
                         {
@@ -301,19 +309,10 @@ class TakeActionOnRequest(Resource):
                     400,
                 )
 
-            service_request.service_status = "Completed"
+            service_request.service_status = ServiceStatus.COMPLETED
             service_request.date_of_completion = datetime.utcnow()
             db.session.commit()
 
-            delete_pattern(f"professional:requests:assigned:{professional_id}")
-            delete_pattern("professional:requests")
-            delete_pattern(f"professional:request:{request_id}")
-            delete_pattern(f"professional:dashboard:stats:{professional_id}")
-            delete_pattern(f"professional:dashboard:activity:{professional_id}")
-            delete_pattern(f"customer:requests:{service_request.customer_id}")
-            delete_pattern(f"customer:request:{request_id}")
-            delete_pattern(f"customer:activity:{service_request.customer_id}")
-
             customer = User.query.get(service_request.customer_id)
             if customer and customer.email:
                 service_name = (
@@ -354,10 +353,10 @@ class TakeActionOnRequest(Resource):
 
 @professional_bp.route("/profile")
 class ProfessionalProfile(Resource):
-    @professional_bp.marshal_with(user_details_model)
     @professional_bp.doc(description="Get professional profile")
     @professional_required()
-    @cache_result("professional:profile", expiration=600, args_as_key=True)
+    @cache_result("professional:profile:{identity}", expiration=600, response=True)
+    @professional_bp.marshal_with(user_details_model)
     def get(self):
         """Get professional profile"""
         professional_id = get_jwt_identity()
@@ -384,11 +383,8 @@ class ProfessionalProfile(Resource):
         for field in allowed_fields:
             if field in data:
                 setattr(professional, field, data[field])
-
         db.session.commit()
 
-        delete_pattern(f"professional:profile:{professional_id}")
-
         return professional
 
 
@@ -489,10 +485,10 @@ class ProfessionalProfilePicture(Resource):
 
 @professional_bp.route("/documents")
 class ProfessionalDocuments(Resource):
-    @professional_bp.marshal_list_with(document_model)
     @professional_bp.doc(description="Get all documents for the professional")
     @professional_required()
-    @cache_result("professional:documents", expiration=600, args_as_key=True)
+    @cache_result("professional:documents:{identity}", expiration=600, response=True)
+    @professional_bp.marshal_list_with(document_model)
     def get(self):
         """Get all documents for the professional."""
         professional_id = get_jwt_identity()
@@ -644,41 +640,43 @@ class DownloadProfessionalDocument(Resource):
 
 @professional_bp.route("/dashboard/stats")
 class DashboardStats(Resource):
-    @professional_bp.marshal_with(dashboard_stats_model)
     @professional_bp.doc(
         description="Get dashboard statistics for the logged-in professional."
     )
     @professional_required()
-    @cache_result("professional:dashboard:stats", expiration=300, args_as_key=True)
+    @cache_result(
+        "professional:dashboard:stats:{identity}",
+        expiration=60,
+        hard_expiration=600,
+        response=True,
+    )
+    @professional_bp.marshal_with(dashboard_stats_model)
     def get(self):
         """Get dashboard statistics for the logged-in professional."""
         professional_id = get_jwt_identity()
 
-        # Query for total earnings, completed jobs, and pending jobs
-        completed_jobs = ServiceRequest.query.filter_by(
-            professional_id=professional_id, service_status="Completed"
-        ).all()
-
-        pending_jobs = ServiceRequest.query.filter_by(
-            professional_id=professional_id, service_status="Pending"
-        ).count()
-
-        accepted_jobs = ServiceRequest.query.filter_by(
-            professional_id=professional_id, service_status="Accepted"
-        ).count()
-
-        # Calculate total earnings
-        total_earnings = 0
-        for job in completed_jobs:
-            # Get the associated service price
-            service = Service.query.get(job.service_id)
-            if service:
-                total_earnings += service.price
+        status = ServiceRequest.service_status
+        completed = status == ServiceStatus.COMPLETED
+
+        # Earnings and every count in one pass over the professional's jobs
+        # (conditional aggregation); COUNT skips the NULLs of unmatched CASEs
+        total_earnings, completed_jobs, pending_jobs, accepted_jobs = (
+            db.session.query(
+                func.coalesce(func.sum(case((completed, Service.price))), 0),
+                func.count(case((completed, 1))),
+                func.count(case((status == ServiceStatus.PENDING, 1))),
+                func.count(case((status == ServiceStatus.ACCEPTED, 1))),
+            )
+            .select_from(ServiceRequest)
+            .outerjoin(Service, ServiceRequest.service_id == Service.id)
+            .filter(ServiceRequest.professional_id == professional_id)
+            .one()
+        )
 
         # Prepare statistics
         stats = {
             "totalEarnings": total_earnings,
-            "completedJobs": len(completed_jobs),
+            "completedJobs": completed_jobs,
             "pendingJobs": pending_jobs,
             "acceptedJobs": accepted_jobs,
         }
@@ -688,12 +686,14 @@ class DashboardStats(Resource):
 
 @professional_bp.route("/dashboard/activity")
 class ActivityFeed(Resource):
-    @professional_bp.marshal_list_with(activity_item_model)
     @professional_bp.doc(
         description="Get activity feed for the logged-in professional."
     )
     @professional_required()
-    @cache_result("professional:dashboard:activity", expiration=300, args_as_key=True)
+    @cache_result(
+        "professional:dashboard:activity:{identity}", expiration=300, response=True
+    )
+    @professional_bp.marshal_list_with(activity_item_model)
     def get(self):
         """Get activity feed for the logged-in professional."""
         professional_id = get_jwt_identity()
@@ -723,7 +723,7 @@ class ActivityFeed(Resource):
                     "customer_profile_image": req.customer.profile_image,
                     "amount": (
                         float(req.service.price)
-                        if req.service_status == "Completed"
+                        if req.service_status == ServiceStatus.COMPLETED
                         else 0
                     ),
                     "timestamp": req.date_of_request,
@@ -4,7 +4,7 @@ from flask_jwt_extended import jwt_required
 from ..models import Service
 from ..database import db
 from .auth import admin_required
-from ..utils.cache import cache_result, delete_pattern
+from ..utils.cache import cache_result
 
 service_bp = Namespace(
     "service", description="Service management operations (Admin only)"
@@ -47,8 +47,8 @@ service_update_model = service_bp.model(
 
 @service_bp.route("/")
 class ServiceList(Resource):
+    @cache_result("service", expiration=600, local=True, response=True)
     @service_bp.marshal_list_with(service_model)
-    @cache_result("service", expiration=600)
     def get(self):
         """List all available services."""
         return Service.query.all()
@@ -68,16 +68,20 @@ class ServiceList(Resource):
         db.session.add(new_service)
         db.session.commit()
 
-        delete_pattern("service:*")
-
         return new_service, 201
 
 
 @service_bp.route("/<int:service_id>")
 class ServiceDetail(Resource):
-    @service_bp.marshal_with(service_model)
     @service_bp.response(404, "Service not found")
-    @cache_result("service", expiration=600, args_as_key=True)
+    @cache_result(
+        "service:{service_id}",
+        expiration=600,
+        local=True,
+        response=True,
+        cache_not_found=True,
+    )
+    @service_bp.marshal_with(service_model)
     def get(self, service_id):
         """Get details of a specific service."""
         service = Service.query.get_or_404(service_id)
@@ -101,9 +105,6 @@ class ServiceDetail(Resource):
             service.description = data["description"]
         db.session.commit()
 
-        delete_pattern(f"service:get:{service_id}")
-        delete_pattern("service:get")
-
         return service
 
     @service_bp.response(204, "Service deleted")
@@ -121,7 +122,4 @@ class ServiceDetail(Resource):
         db.session.delete(service)
         db.session.commit()
 
-        delete_pattern(f"service:get:{service_id}")
-        delete_pattern("service:get")
-
         return "", 204
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Optional
+from app.celery_utils import ContextTask, celery_app
+
+
+@celery_app.task(bind=True, ignore_result=True, base=ContextTask)
+def refresh_cache_task(
+    self,
+    target: str,
+    key: str,
+    path: Optional[str],
+    query_string: str,
+    identity: Any,
+    args: List[Any],
+    kwargs: Dict[str, Any],
+):
+    """
+    Celery task to recompute a stale cache_result entry in the background.
+
+    Args:
+        target: Dotted name of the cached function
+        key: Cache key of the stale entry
+        path: Request path the entry was cached for (optional)
+        query_string: Query string of that request
+        identity: JWT identity of that request (optional)
+        args: Positional arguments of the cached call, without self
+        kwargs: Keyword (route) arguments of the cached call
+
+    Returns:
+        bool: Whether the entry was rewritten
+    """
+    from app.utils.cache import refresh_cached_result
+
+    return refresh_cached_result(
+        target, key, path, query_string, identity, args, kwargs
+    )
+
+
+@celery_app.task(bind=True, ignore_result=True, base=ContextTask)
+def warm_cache_task(
+    self, users: Optional[int] = None, concurrency: Optional[int] = None
+):
+    """
+    Celery task to precompute cached endpoints after a deploy or a purge.
+
+    Args:
+        users: Number of recently active customers and professionals to warm
+            (default CACHE_WARM_USERS)
+        concurrency: Number of requests run at once
+            (default CACHE_WARM_CONCURRENCY)
+
+    Returns:
+        dict: Number of requests made, warmed and failed, and the time taken
+    """
+    from app.utils.cache_warming import warm_cache
+
+    return warm_cache(users, concurrency)
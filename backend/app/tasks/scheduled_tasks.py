@@ -1,7 +1,7 @@
 # app/tasks/scheduled_tasks.py
 from app.celery_utils import celery_app
 from app import create_app
-from app.models import User, ServiceRequest, Service
+from app.models import Role, User, ServiceRequest, ServiceStatus, Service
 from sqlalchemy import and_, or_
 from datetime import datetime, timedelta
 from .email_tasks import send_email_task, send_notification_email_task
@@ -27,7 +27,7 @@ def daily_reminder_task(self):
     with app.app_context():
         # Get all pending service requests
         pending_requests = ServiceRequest.query.filter_by(
-            service_status="pending"
+            service_status=ServiceStatus.PENDING
         ).all()
 
         # Send reminder emails to customers with pending requests
@@ -65,7 +65,7 @@ def daily_reminder_task(self):
                     ServiceRequest.query.join(Service)
                     .filter(
                         and_(
-                            ServiceRequest.service_status == "pending",
+                            ServiceRequest.service_status == ServiceStatus.PENDING,
                             ServiceRequest.professional_id == None,
                             (
                                 Service.name.like(f"%{professional.service_type}%")
@@ -112,7 +112,7 @@ def monthly_activity_report_task(self):
         ).count()
         completed_requests = ServiceRequest.query.filter(
             and_(
-                ServiceRequest.service_status == "completed",
+                ServiceRequest.service_status == ServiceStatus.COMPLETED,
                 ServiceRequest.date_of_completion >= month_start,
             )
         ).count()
@@ -175,7 +175,7 @@ def export_closed_requests_csv_task(self):
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         completed_requests = ServiceRequest.query.filter(
             and_(
-                ServiceRequest.service_status == "completed",
+                ServiceRequest.service_status == ServiceStatus.COMPLETED,
                 ServiceRequest.date_of_completion >= thirty_days_ago,
             )
         ).all()
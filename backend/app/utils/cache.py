@@ -1,12 +1,64 @@
+import hashlib
+import inspect
 import json
-import pickle
-from functools import wraps
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from string import Formatter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlencode
 import redis
-from flask import current_app, request
+from redis.exceptions import LockError
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import (
+    create_access_token,
+    get_jwt_identity,
+    verify_jwt_in_request,
+)
+from flask_restx.representations import output_json
+from flask_restx.utils import unpack
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import DeclarativeMeta
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import NotFound
+from werkzeug.http import unquote_etag
+from werkzeug.wrappers import Response
+from ..tasks.cache_tasks import refresh_cache_task
+from .cache_backends import CacheBackend, MemoryBackend, MemoryStore, RedisBackend
 from datetime import datetime, date
 
+# Optional codecs; the cache falls back to json and zlib without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 class SQLAlchemyEncoder(json.JSONEncoder):
     """Custom JSON encoder for SQLAlchemy models"""
@@ -58,18 +110,194 @@ class SQLAlchemyEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
-# Initialize Redis client
-def get_redis_client(decode_responses=True):
+# Cached values are stored as bytes: a version byte, a flags byte naming the
+# serializer (low nibble) and compression (high nibble), then the data.
+# Values written in an unknown format are treated as misses, so the format
+# can change without flushing Redis.
+CODEC_VERSION = 1
+
+SERIALIZER_RAW = 0  # Bytes stored as they are, e.g. a rendered response
+SERIALIZER_JSON = 1  # json or orjson, which read each other's output
+SERIALIZER_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+
+class CodecError(ValueError):
+    """Raised for cached bytes that cannot be decoded"""
+
+
+# What serialize_value raises for a value it cannot encode: json raises
+# TypeError, ValueError or OverflowError, orjson's JSONEncodeError is a
+# TypeError, and msgpack's PackValueError and PackOverflowError subclass the
+# other two
+SERIALIZE_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+def _to_primitive(obj: Any) -> Any:
     """
-    Get Redis client instance using application configuration
+    Fallback for orjson and msgpack, with the same conversions as json
+    """
+    return SQLAlchemyEncoder().default(obj)
+
+
+def serialize_value(value: Any) -> Tuple[bytes, int]:
+    """
+    Serialize a value with the configured serializer (CACHE_SERIALIZER)
+    """
+    name = current_app.config.get("CACHE_SERIALIZER", "auto")
+    if name == "msgpack" and msgpack is not None:
+        return msgpack.packb(value, default=_to_primitive), SERIALIZER_MSGPACK
+    if name in ("auto", "orjson") and orjson is not None:
+        return (
+            orjson.dumps(value, default=_to_primitive, option=orjson.OPT_NON_STR_KEYS),
+            SERIALIZER_JSON,
+        )
+    # Serialize with the custom encoder to support SQLAlchemy models
+    return json.dumps(value, cls=SQLAlchemyEncoder).encode(), SERIALIZER_JSON
+
+
+def deserialize_value(data: bytes, serializer: int) -> Any:
+    if serializer == SERIALIZER_RAW:
+        return data
+    if serializer == SERIALIZER_MSGPACK:
+        if msgpack is None:
+            raise CodecError("msgpack is not installed")
+        return msgpack.unpackb(data)
+    if serializer == SERIALIZER_JSON:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    raise CodecError(f"Unknown serializer {serializer}")
+
+
+def pack_value(data: bytes, serializer: int) -> bytes:
+    """
+    Frame serialized data, compressing it when it is above
+    CACHE_COMPRESSION_THRESHOLD bytes
     """
     app_config = current_app.config
-    return redis.Redis(
-        host=app_config.get("REDIS_HOST", "localhost"),
-        port=app_config.get("REDIS_PORT", 6379),
-        db=app_config.get("REDIS_CACHE_DB", 1),
-        decode_responses=decode_responses,
-    )
+    name = app_config.get("CACHE_COMPRESSION", "auto")
+    compression = COMPRESSION_NONE
+    if name != "none" and len(data) >= app_config.get(
+        "CACHE_COMPRESSION_THRESHOLD", 1024
+    ):
+        if name in ("auto", "zstd") and zstandard is not None:
+            data = zstandard.ZstdCompressor(level=3).compress(data)
+            compression = COMPRESSION_ZSTD
+        else:
+            data = zlib.compress(data, 6)
+            compression = COMPRESSION_ZLIB
+    return bytes((CODEC_VERSION, compression << 4 | serializer)) + data
+
+
+def unpack_value(blob: bytes) -> Tuple[bytes, int]:
+    """
+    Undo pack_value; returns the serialized data and its serializer
+    """
+    if len(blob) < 2 or blob[0] != CODEC_VERSION:
+        raise CodecError("Unknown cache value format")
+    compression, serializer = blob[1] >> 4, blob[1] & 0x0F
+    data = blob[2:]
+    try:
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise CodecError("zstandard is not installed")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        elif compression == COMPRESSION_ZLIB:
+            data = zlib.decompress(data)
+        elif compression != COMPRESSION_NONE:
+            raise CodecError(f"Unknown compression {compression}")
+    except (zlib.error, getattr(zstandard, "ZstdError", zlib.error)) as e:
+        raise CodecError(str(e)) from e
+    return data, serializer
+
+
+def encode_value(value: Any) -> bytes:
+    return pack_value(*serialize_value(value))
+
+
+def decode_value(blob: bytes) -> Any:
+    return deserialize_value(*unpack_value(blob))
+
+
+# Connection pools are created once per worker process and shared by every
+# client handed out by get_redis_client(), as are in-process backend stores.
+_connection_pools: Dict[Tuple, redis.ConnectionPool] = {}
+_connection_pools_lock = threading.Lock()
+_memory_stores: Dict[int, MemoryStore] = {}
+
+
+def get_connection_pool(decode_responses=True) -> redis.ConnectionPool:
+    """
+    Get the process-wide Redis connection pool for the cache database
+    """
+    app_config = current_app.config
+    host = app_config.get("REDIS_HOST", "localhost")
+    port = app_config.get("REDIS_PORT", 6379)
+    db = app_config.get("REDIS_CACHE_DB", 1)
+    # Key on the pid as well so forked workers never share sockets with the master
+    pool_key = (os.getpid(), host, port, db, decode_responses)
+
+    pool = _connection_pools.get(pool_key)
+    if pool is None:
+        with _connection_pools_lock:
+            pool = _connection_pools.get(pool_key)
+            if pool is None:
+                pool = redis.BlockingConnectionPool(
+                    host=host,
+                    port=port,
+                    db=db,
+                    decode_responses=decode_responses,
+                    max_connections=app_config.get("REDIS_MAX_CONNECTIONS", 50),
+                    timeout=app_config.get("REDIS_POOL_TIMEOUT", 1),
+                    socket_timeout=app_config.get("REDIS_SOCKET_TIMEOUT", 0.5),
+                    socket_connect_timeout=app_config.get(
+                        "REDIS_SOCKET_CONNECT_TIMEOUT", 0.25
+                    ),
+                    health_check_interval=app_config.get(
+                        "REDIS_HEALTH_CHECK_INTERVAL", 30
+                    ),
+                )
+                _connection_pools[pool_key] = pool
+    return pool
+
+
+def get_redis_client(decode_responses=True) -> RedisBackend:
+    """
+    Get Redis client instance backed by the shared connection pool
+    """
+    return RedisBackend(connection_pool=get_connection_pool(decode_responses))
+
+
+def get_memory_store() -> MemoryStore:
+    """
+    Get this worker's store for the in-process cache backend
+    """
+    pid = os.getpid()
+    store = _memory_stores.get(pid)
+    if store is None:
+        store = _memory_stores.setdefault(
+            pid,
+            MemoryStore(
+                current_app.config.get("CACHE_MEMORY_MAX_KEYS", 100000),
+                # Losing a generation counter would revive invalidated entries
+                pinned_prefixes=(f"{NAMESPACE_VERSION_PREFIX}:",),
+            ),
+        )
+    return store
+
+
+def get_cache_backend(decode_responses=True) -> CacheBackend:
+    """
+    Get the storage configured by CACHE_BACKEND ("redis" or "memory")
+    """
+    backend = current_app.config.get("CACHE_BACKEND", "redis")
+    if backend == "memory":
+        return MemoryBackend(get_memory_store(), decode_responses)
+    if backend != "redis":
+        raise ValueError(f"Unknown cache backend {backend}")
+    return get_redis_client(decode_responses)
 
 
 def get_default_expiration():
@@ -79,134 +307,1469 @@ def get_default_expiration():
     return current_app.config.get("REDIS_DEFAULT_EXPIRATION", 3600)
 
 
-def get_cache(key: str) -> Optional[str]:
+# Redis only makes reads faster, so an outage must never take the API down.
+# Cache calls run under redis_guard(): after CACHE_BREAKER_FAILURE_THRESHOLD
+# consecutive failures the breaker opens and the cache is skipped outright,
+# without waiting on socket timeouts, for CACHE_BREAKER_RESET_TIMEOUT seconds.
+# Then a single trial call is let through (half open) to see if Redis is back.
+class CacheUnavailable(Exception):
     """
-    Get a value from the cache
+    Raised when Redis failed or the circuit breaker is open
     """
-    return get_redis_client().get(key)
 
 
-def set_cache(key: str, value: str, expiration: int = None) -> bool:
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to Redis
+        """
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                # Let this caller probe Redis; everyone else keeps bypassing
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self) -> None:
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, error: Exception) -> bool:
+        """
+        Count a failed call; returns True if it opened the breaker
+        """
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                return True
+            return False
+
+    def info(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(
+                round(self.opened_at + self.reset_timeout - time.monotonic(), 1), 0
+            )
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_in_seconds": retry_in,
+            "trips": self.trips,
+            "last_error": self.last_error,
+        }
+
+
+_circuit_breakers: Dict[int, CircuitBreaker] = {}
+
+
+def get_circuit_breaker() -> CircuitBreaker:
     """
-    Set a value in the cache with expiration in seconds (default from config)
+    Get this worker's Redis circuit breaker
+    """
+    pid = os.getpid()
+    breaker = _circuit_breakers.get(pid)
+    if breaker is None:
+        app_config = current_app.config
+        breaker = _circuit_breakers.setdefault(
+            pid,
+            CircuitBreaker(
+                app_config.get("CACHE_BREAKER_FAILURE_THRESHOLD", 5),
+                app_config.get("CACHE_BREAKER_RESET_TIMEOUT", 30),
+            ),
+        )
+    return breaker
+
+
+@contextmanager
+def redis_guard() -> Iterator[None]:
+    """
+    Run Redis calls under the circuit breaker
+
+    Raises CacheUnavailable instead of calling Redis while the breaker is
+    open, and in place of connection errors and timeouts inside the block.
+    """
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        raise CacheUnavailable("Redis circuit breaker is open")
+    failed = False
+    try:
+        yield
+    except redis.ResponseError:
+        # Redis answered, so this is a bug rather than an outage
+        raise
+    except redis.RedisError as e:
+        failed = True
+        if breaker.record_failure(e):
+            current_app.logger.error(
+                f"Redis unavailable, bypassing the cache for "
+                f"{breaker.reset_timeout}s: {str(e)}"
+            )
+        raise CacheUnavailable(str(e)) from e
+    finally:
+        # Any other outcome means Redis answered; this also ends a probe
+        if not failed:
+            breaker.record_success()
+
+
+# Cache metrics are counted per key prefix in each worker and flushed to one
+# Redis hash per prefix (HINCRBY/HINCRBYFLOAT) every few seconds, so that
+# recording a hit never costs a round trip of its own.
+METRICS_PREFIX = "cache:metrics"
+METRICS_INDEX = f"{METRICS_PREFIX}:prefixes"
+_VERSION_SEGMENT = re.compile(r":v\d+(?:\.\d+)*(?::|$)")
+
+
+def metrics_prefix(key: str) -> str:
+    """
+    Group a key or namespace for metrics: "customer:stats:42:v0.1.3:get:..."
+    becomes "customer:stats:*", so every user's entries count together
+    """
+    namespace = _VERSION_SEGMENT.split(key, 1)[0]
+    return ":".join("*" if part.isdigit() else part for part in namespace.split(":"))
+
+
+class CacheMetrics:
+    """
+    In-process per-prefix counters, periodically flushed to Redis
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._counters: Dict[str, Dict[str, Union[int, float]]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, prefix: str, **values: Union[int, float]) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(prefix, {})
+            for name, value in values.items():
+                counters[name] = counters.get(name, 0) + value
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            self._last_flush = time.monotonic()
+        if not counters:
+            return
+        try:
+            with redis_guard():
+                pipe = get_cache_backend().pipeline(transaction=False)
+                for prefix, values in counters.items():
+                    metrics_key = f"{METRICS_PREFIX}:{prefix}"
+                    for name, value in values.items():
+                        if isinstance(value, float):
+                            pipe.hincrbyfloat(metrics_key, name, value)
+                        else:
+                            pipe.hincrby(metrics_key, name, value)
+                    pipe.sadd(METRICS_INDEX, prefix)
+                pipe.execute()
+        except CacheUnavailable as e:
+            # Metrics are best effort; never fail a request over them
+            current_app.logger.warning(f"Failed to flush cache metrics: {str(e)}")
+
+
+_cache_metrics: Dict[int, CacheMetrics] = {}
+
+
+def get_metrics_recorder() -> Optional[CacheMetrics]:
+    """
+    Get this worker's metrics recorder, or None if metrics are disabled
+    """
+    app_config = current_app.config
+    if not app_config.get("CACHE_METRICS_ENABLED", True):
+        return None
+    pid = os.getpid()
+    metrics = _cache_metrics.get(pid)
+    if metrics is None:
+        metrics = _cache_metrics.setdefault(
+            pid, CacheMetrics(app_config.get("CACHE_METRICS_FLUSH_INTERVAL", 10))
+        )
+    return metrics
+
+
+def record_cache_metrics(key: str, **values: Union[int, float]) -> None:
+    """
+    Add to the counters of the prefix a key belongs to
+    """
+    metrics = get_metrics_recorder()
+    if metrics is not None:
+        metrics.record(metrics_prefix(key), **values)
+
+
+def get_raw_cache(key: str) -> Optional[bytes]:
+    """
+    Get the stored bytes of a cache entry
+
+    Raises CacheUnavailable if Redis cannot be reached.
+    """
+    started = time.perf_counter()
+    with redis_guard():
+        blob = get_cache_backend(decode_responses=False).get(key)
+    record_cache_metrics(
+        key,
+        redis_calls=1,
+        redis_seconds=time.perf_counter() - started,
+        bytes_read=len(blob) if blob is not None else 0,
+    )
+    return blob
+
+
+def set_raw_cache(key: str, blob: bytes, expiration: int = None) -> bool:
+    """
+    Store the bytes of a cache entry with expiration in seconds
+
+    Raises CacheUnavailable if Redis cannot be reached.
     """
     if expiration is None:
         expiration = get_default_expiration()
-    return get_redis_client().setex(key, expiration, value)
+    started = time.perf_counter()
+    with redis_guard():
+        result = get_cache_backend(decode_responses=False).setex(key, expiration, blob)
+    record_cache_metrics(
+        key,
+        redis_calls=1,
+        redis_seconds=time.perf_counter() - started,
+        bytes_written=len(blob),
+    )
+    return result
+
+
+def get_cache(key: str) -> Any:
+    """
+    Get a value from the cache, or None if it is missing, unreadable or
+    Redis is unavailable
+    """
+    try:
+        blob = get_raw_cache(key)
+    except CacheUnavailable:
+        return None
+    if blob is None:
+        return None
+    try:
+        return decode_value(blob)
+    except CodecError:
+        return None
+
+
+def set_cache(key: str, value: Any, expiration: int = None) -> bool:
+    """
+    Set a value in the cache with expiration in seconds (default from config)
+    """
+    try:
+        return set_raw_cache(key, encode_value(value), expiration)
+    except CacheUnavailable:
+        return False
 
 
 def delete_cache(key: str) -> bool:
     """
     Delete a value from the cache
+
+    If Redis is unavailable the key is deleted once it is back (see
+    defer_delete) and False is returned.
     """
-    return get_redis_client().delete(key) > 0
+    try:
+        with redis_guard():
+            # UNLINK frees the value in the background instead of blocking Redis
+            return get_cache_backend().unlink(key) > 0
+    except CacheUnavailable:
+        defer_delete([key])
+        return False
 
 
-def delete_pattern(pattern: str) -> int:
+def delete_pattern(pattern: str, batch_size: int = 500) -> int:
     """
     Delete all keys matching a pattern
+
+    Keys are found with SCAN and removed in batches with UNLINK, so even a
+    large purge never blocks Redis the way KEYS and DEL would. If Redis is or
+    becomes unavailable the purge stops; the keys deleted so far are counted.
     """
-    client = get_redis_client()
-    keys = client.keys(pattern)
-    if keys:
-        return client.delete(*keys)
-    return 0
+    client = get_cache_backend()
+    count = current_app.config.get("CACHE_SCAN_COUNT", 1000)
+    deleted = 0
+    batch = []
+    try:
+        with redis_guard():
+            for key in client.scan_iter(match=pattern, count=count):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += client.unlink(*batch)
+    except CacheUnavailable as e:
+        current_app.logger.warning(
+            f"Stopped deleting {pattern} after {deleted} keys: {str(e)}"
+        )
+    return deleted
+
+
+# Every cache namespace (e.g. "customer:requests:42") owns a generation counter.
+# Keys embed the counters of the namespace and all of its ancestors, so bumping
+# one counter orphans every key below it; orphans simply age out by TTL.
+NAMESPACE_VERSION_PREFIX = "cache:version"
 
+# With adaptive TTLs, bumps are also counted per namespace in fixed windows of
+# CACHE_ADAPTIVE_TTL_WINDOW seconds ("cache:writes:<namespace>:<window>"); the
+# current and previous windows give each namespace's write rate.
+NAMESPACE_WRITES_PREFIX = "cache:writes"
 
-def get_or_set_cache(key: str, callback: Callable, expiration: int = None) -> Any:
+
+def _namespace_levels(namespace: str) -> List[str]:
     """
-    Get value from cache or set it if it doesn't exist
+    Expand "a:b:c" into ["a", "a:b", "a:b:c"]
     """
-    cached = get_cache(key)
-    if cached is not None:
-        return json.loads(cached)
+    parts = namespace.split(":")
+    return [":".join(parts[: i + 1]) for i in range(len(parts))]
 
-    # Get fresh data from callback
-    data = callback()
 
-    # Cache the data
-    if expiration is None:
-        expiration = get_default_expiration()
-    set_cache(key, json.dumps(data), expiration)
+def get_namespace_version(namespace: str) -> str:
+    """
+    Get the generation token for a namespace, covering all of its ancestors
+    """
+    version_keys = [
+        f"{NAMESPACE_VERSION_PREFIX}:{level}" for level in _namespace_levels(namespace)
+    ]
+    with redis_guard():
+        versions = get_cache_backend().mget(version_keys)
+    return ".".join(version or "0" for version in versions)
+
+
+def namespaced_key(namespace: str, *parts: str) -> str:
+    """
+    Build a cache key inside the current generation of a namespace
+    """
+    return ":".join(
+        [namespace, f"v{get_namespace_version(namespace)}", *[str(p) for p in parts]]
+    )
+
 
-    return data
+def _incr_namespaces(namespaces: List[str]) -> List[int]:
+    ttl = current_app.config.get("REDIS_NAMESPACE_VERSION_TTL", 604800)
+    with redis_guard():
+        pipe = get_cache_backend().pipeline(transaction=False)
+        for namespace in namespaces:
+            version_key = f"{NAMESPACE_VERSION_PREFIX}:{namespace}"
+            pipe.incr(version_key)
+            pipe.expire(version_key, ttl)
+            # Tell every worker to drop its in-process copies of the namespace
+            pipe.publish(INVALIDATION_CHANNEL, namespace)
+        if _adaptive_ttl_enabled():
+            window = _writes_window()
+            now = time.time()
+            for namespace in namespaces:
+                writes_key = _writes_keys(namespace, now)[0]
+                pipe.incr(writes_key)
+                pipe.expire(writes_key, 2 * window)
+        return pipe.execute()[: 3 * len(namespaces) : 3]
 
 
-def cache_result(prefix: str, expiration: int = None, args_as_key: bool = False):
+def _bump_namespaces(namespaces: List[str]) -> List[Optional[int]]:
     """
-    Decorator to cache function results
+    Bump the generation counters of several namespaces in one round trip
 
-    Args:
-        prefix: Prefix for the cache key
-        expiration: Cache expiration time in seconds (default from config)
-        args_as_key: Whether to include function arguments in the cache key
+    If Redis is unavailable the bumps are kept for apply_deferred_invalidations
+    and None is returned for each namespace.
     """
+    if not namespaces:
+        return []
+    local_cache = _local_caches.get(os.getpid())
+    if local_cache is not None:
+        for namespace in namespaces:
+            local_cache.invalidate(namespace)
 
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Generate a cache key
-            if args_as_key and args:
-                key_parts = [prefix, func.__name__] + [str(arg) for arg in args]
-                key = ":".join(key_parts)
-            else:
-                key = f"{prefix}:{func.__name__}"
+    for namespace in namespaces:
+        record_cache_metrics(namespace, invalidations=1)
+    try:
+        return _incr_namespaces(namespaces)
+    except CacheUnavailable as e:
+        with _deferred_invalidations_lock:
+            _deferred_invalidations.setdefault(os.getpid(), {}).update(
+                dict.fromkeys(namespaces)
+            )
+        current_app.logger.warning(
+            f"Deferred invalidation of {', '.join(namespaces)}: {str(e)}"
+        )
+        return [None] * len(namespaces)
 
-            # For API endpoints, add request path and query params to the key
-            if request:
-                query_string = request.query_string.decode("utf-8")
-                if query_string:
-                    key += f":{request.path}?{query_string}"
-                else:
-                    key += f":{request.path}"
 
-            # Try to get from cache
-            cached = get_cache(key)
-            if cached is not None:
-                return json.loads(cached)
+# Invalidations that could not reach Redis, per worker, and keys that could
+# not be deleted (see defer_delete). They are retried before this worker
+# reads from the cache again, so it never serves entries it knows to be
+# stale once Redis is back.
+_deferred_invalidations: Dict[int, Dict[str, None]] = {}
+_deferred_deletes: Dict[int, Dict[str, None]] = {}
+_deferred_invalidations_lock = threading.Lock()
 
-            # Call the function
-            result = func(*args, **kwargs)
 
-            # Cache the result using SQLAlchemyEncoder for SQLAlchemy models
-            if expiration is None:
-                exp = get_default_expiration()
-            else:
-                exp = expiration
+def defer_delete(keys: Iterable[str]) -> None:
+    """
+    Delete keys once Redis can be reached again
+    """
+    with _deferred_invalidations_lock:
+        _deferred_deletes.setdefault(os.getpid(), {}).update(dict.fromkeys(keys))
 
-            try:
-                # Try to serialize with the custom encoder
-                serialized = json.dumps(result, cls=SQLAlchemyEncoder)
-                set_cache(key, serialized, exp)
-            except (TypeError, Exception) as e:
-                # If serialization fails, log it but continue without caching
-                current_app.logger.warning(
-                    f"Failed to cache result for {key}: {str(e)}"
+
+def count_deferred_invalidations() -> int:
+    pid = os.getpid()
+    return len(_deferred_invalidations.get(pid, ())) + len(
+        _deferred_deletes.get(pid, ())
+    )
+
+
+def apply_deferred_invalidations() -> int:
+    """
+    Retry this worker's deferred invalidations and deletes
+
+    Returns the number of counters bumped and keys deleted; raises
+    CacheUnavailable, keeping them for later, while Redis is still unavailable.
+    """
+    pid = os.getpid()
+    if not _deferred_invalidations.get(pid) and not _deferred_deletes.get(pid):
+        return 0
+    with _deferred_invalidations_lock:
+        pending = _deferred_invalidations.pop(pid, None) or {}
+        keys = _deferred_deletes.pop(pid, None) or {}
+    if not pending and not keys:
+        return 0
+
+    namespaces = _collapse_namespaces(pending)
+    try:
+        with redis_guard():
+            if namespaces:
+                _incr_namespaces(namespaces)
+            if keys:
+                get_cache_backend().unlink(*keys)
+    except CacheUnavailable:
+        with _deferred_invalidations_lock:
+            _deferred_invalidations.setdefault(pid, {}).update(pending)
+            _deferred_deletes.setdefault(pid, {}).update(keys)
+        raise
+    current_app.logger.info(
+        f"Applied {len(namespaces) + len(keys)} deferred cache invalidations"
+    )
+    return len(namespaces) + len(keys)
+
+
+def _collapse_namespaces(namespaces: Iterable[str]) -> List[str]:
+    """
+    Drop duplicates and namespaces already covered by one of their ancestors
+    """
+    pending = dict.fromkeys(namespaces)
+    return [
+        namespace
+        for namespace in pending
+        if not any(level in pending for level in _namespace_levels(namespace)[:-1])
+    ]
+
+
+def get_ttl_policy(prefix: str) -> Dict[str, Any]:
+    """
+    Get the CACHE_TTL_POLICIES entry of a cache_result prefix, as a dict
+    """
+    policy = current_app.config.get("CACHE_TTL_POLICIES", {}).get(prefix)
+    if policy is None:
+        return {}
+    if isinstance(policy, dict):
+        return policy
+    return {"ttl": policy}
+
+
+def _adaptive_ttl_enabled() -> bool:
+    config = current_app.config
+    return config.get("CACHE_ADAPTIVE_TTL", False) or any(
+        isinstance(policy, dict) and policy.get("adaptive")
+        for policy in config.get("CACHE_TTL_POLICIES", {}).values()
+    )
+
+
+def _writes_window() -> int:
+    return current_app.config.get("CACHE_ADAPTIVE_TTL_WINDOW", 3600)
+
+
+def _writes_keys(namespace: str, now: float) -> Tuple[str, str]:
+    """
+    Get the write counters of a namespace for the current and previous window
+    """
+    window = int(now // _writes_window())
+    return (
+        f"{NAMESPACE_WRITES_PREFIX}:{namespace}:{window}",
+        f"{NAMESPACE_WRITES_PREFIX}:{namespace}:{window - 1}",
+    )
+
+
+def get_invalidation_rate(namespace: str) -> Optional[float]:
+    """
+    Get how many times per second a namespace, or one of its ancestors, was
+    invalidated over the last one to two windows; None if Redis is unavailable
+    """
+    window = _writes_window()
+    now = time.time()
+    keys = [
+        key
+        for level in _namespace_levels(namespace)
+        for key in _writes_keys(level, now)
+    ]
+    try:
+        with redis_guard():
+            counts = get_cache_backend().mget(keys)
+    except CacheUnavailable:
+        return None
+    writes = sum(int(count) for count in counts if count is not None)
+    # The previous window plus however much of the current one has passed
+    return writes / (window + now % window)
+
+
+def resolve_expiration(prefix: str, namespace: str, expiration: int) -> int:
+    """
+    Get the TTL of a cache_result entry: the one its prefix's policy sets,
+    else the decorator's, adapted to the namespace's write rate if enabled
+
+    An adaptive TTL is the mean time between invalidations of the namespace:
+    rarely written scopes are kept (and hit) longer, while in churny ones
+    entries that invalidation has orphaned expire, and free memory, sooner.
+    It stays between the policy's "min" and "max", by default within
+    CACHE_ADAPTIVE_TTL_RANGE times the TTL either way.
+    """
+    config = current_app.config
+    policy = get_ttl_policy(prefix)
+    ttl = policy.get("ttl", expiration)
+    if not policy.get("adaptive", config.get("CACHE_ADAPTIVE_TTL", False)):
+        return ttl
+
+    spread = config.get("CACHE_ADAPTIVE_TTL_RANGE", 4)
+    lowest = policy.get("min", ttl / spread)
+    # Keys embed the namespace version, which must outlive them
+    highest = min(
+        policy.get("max", ttl * spread),
+        config.get("REDIS_NAMESPACE_VERSION_TTL", 604800),
+    )
+    rate = get_invalidation_rate(namespace)
+    if rate is None:
+        return ttl
+    if rate == 0:
+        return int(highest)
+    return int(min(max(1 / rate, lowest), highest))
+
+
+def invalidate_namespace(namespace: str) -> Optional[int]:
+    """
+    Invalidate a namespace and everything below it with a single INCR
+
+    Inside a request the invalidation is only recorded; it is applied once
+    the session commits (see flush_invalidations) and dropped if it rolls
+    back, and None is returned. Outside a request it is applied at once and
+    the new generation is returned.
+    """
+    if has_request_context():
+        g.setdefault("_cache_invalidations", {})[namespace] = None
+        return None
+    return _bump_namespaces([namespace])[0]
+
+
+def flush_invalidations() -> int:
+    """
+    Apply the invalidations recorded in this request in a single pipeline
+
+    Returns the number of counters bumped.
+    """
+    if not has_request_context():
+        return 0
+    pending = g.pop("_cache_invalidations", None)
+    if not pending:
+        return 0
+    namespaces = _collapse_namespaces(pending)
+    _bump_namespaces(namespaces)
+    return len(namespaces)
+
+
+def discard_invalidations() -> None:
+    """
+    Forget the invalidations recorded in this request
+    """
+    if has_request_context():
+        g.pop("_cache_invalidations", None)
+
+
+# Invalidations worked out from the rows a session flushes (see
+# cache_dependencies) wait in session.info until the transaction ends
+SESSION_INVALIDATIONS = "cache_invalidations"
+
+
+def defer_invalidation(session: Session, namespace: str) -> None:
+    """
+    Invalidate a namespace once the session commits, or never if it rolls back
+    """
+    session.info.setdefault(SESSION_INVALIDATIONS, {})[namespace] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations_after_commit(session) -> None:
+    pending = session.info.pop(SESSION_INVALIDATIONS, None)
+    if not has_request_context():
+        if pending:
+            _bump_namespaces(_collapse_namespaces(pending))
+        return
+    if pending:
+        g.setdefault("_cache_invalidations", {}).update(pending)
+    flush_invalidations()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations_after_rollback(session) -> None:
+    session.info.pop(SESSION_INVALIDATIONS, None)
+    discard_invalidations()
+
+
+def init_cache(app) -> None:
+    """
+    Flush invalidations recorded after the last commit of a request before
+    its response is sent, and drop them if the request fails
+    """
+
+    @app.after_request
+    def _flush_invalidations_after_request(response):
+        flush_invalidations()
+        return response
+
+    @app.teardown_request
+    def _discard_invalidations_on_teardown(exc):
+        discard_invalidations()
+
+
+# In-process (L1) cache that sits in front of Redis for hot, rarely-changing
+# reads. Entries are keyed by their unversioned key and dropped when an
+# invalidation for their namespace is broadcast on INVALIDATION_CHANNEL.
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class _FrequencySketch:
+    """
+    Approximate access counter (count-min sketch) used for TinyLFU admission
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, capacity: int):
+        self.width = max(64, 1 << (capacity * 4 - 1).bit_length())
+        self.table = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self.additions = 0
+        self.sample_size = capacity * 10
+
+    def _indexes(self, key: str):
+        for row in range(self.DEPTH):
+            yield row, hash((row, key)) % self.width
+
+    def increment(self, key: str) -> None:
+        for row, index in self._indexes(key):
+            if self.table[row][index] < self.MAX_COUNT:
+                self.table[row][index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            # Age every counter so that yesterday's hot keys can be evicted
+            for row in self.table:
+                for index in range(self.width):
+                    row[index] >>= 1
+            self.additions //= 2
+
+    def frequency(self, key: str) -> int:
+        return min(self.table[row][index] for row, index in self._indexes(key))
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with TinyLFU admission
+
+    Bounded both by entry count and by the serialized size of the entries.
+    When the cache is full a new entry is only admitted if it has been
+    requested more often than the least recently used entry it would evict.
+
+    generation counts invalidations. A caller reads it before fetching a value
+    and passes it to set, which drops the value if an invalidation arrived in
+    the meantime, since the value may predate it.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int, str, float]]" = OrderedDict()
+        self._sketch = _FrequencySketch(max_entries)
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, size, _, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(
+        self,
+        key: str,
+        namespace: str,
+        value: Any,
+        size: int,
+        generation: Optional[int] = None,
+    ) -> bool:
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and (
+                len(self._entries) >= self.max_entries
+                or self.size + size > self.max_bytes
+            ):
+                victim = next(iter(self._entries))
+                if self._sketch.frequency(key) <= self._sketch.frequency(victim):
+                    return False
+                self._remove(victim)
+            self._entries[key] = (value, size, namespace, time.monotonic() + self.ttl)
+            self.size += size
+            return True
+
+    def invalidate(self, namespace: str) -> int:
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key
+                for key, (_, _, entry_namespace, _) in self._entries.items()
+                if entry_namespace == namespace
+                or entry_namespace.startswith(namespace + ":")
+            ]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self.size -= size
+
+
+_local_caches: Dict[int, LocalCache] = {}
+_invalidation_listeners: Dict[int, Any] = {}
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache() -> Optional[LocalCache]:
+    """
+    Get this worker's L1 cache, or None when it is disabled in the config
+    """
+    app_config = current_app.config
+    if not app_config.get("CACHE_L1_ENABLED", True):
+        return None
+
+    pid = os.getpid()
+    local_cache = _local_caches.get(pid)
+    if local_cache is None:
+        with _local_cache_lock:
+            local_cache = _local_caches.get(pid)
+            if local_cache is None:
+                local_cache = LocalCache(
+                    max_entries=app_config.get("CACHE_L1_MAX_ENTRIES", 1024),
+                    max_bytes=app_config.get("CACHE_L1_MAX_BYTES", 16 * 1024 * 1024),
+                    ttl=app_config.get("CACHE_L1_TTL", 60),
                 )
-                # Return the result without caching
+                _local_caches[pid] = local_cache
+    _ensure_invalidation_listener(local_cache)
+    return local_cache
 
-            return result
 
-        return wrapper
+def _ensure_invalidation_listener(local_cache: LocalCache) -> None:
+    """
+    Start the pub/sub thread that applies invalidations from other workers
+    """
+    pid = os.getpid()
+    if pid in _invalidation_listeners:
+        return
+    if not get_cache_backend().shared:
+        # An in-process backend has no other workers to hear from
+        return
 
-    return decorator
+    with _local_cache_lock:
+        if pid in _invalidation_listeners:
+            return
+        current_logger = current_app.logger
+
+        def handle_message(message):
+            local_cache.invalidate(message["data"])
 
+        def handle_error(error, pubsub, thread):
+            # Messages may have been missed while disconnected, so start over
+            current_logger.warning(f"Cache invalidation listener failed: {error}")
+            thread.stop()
+            pubsub.close()
+            local_cache.clear()
+            _invalidation_listeners.pop(pid, None)
 
-def cache_complex_object(key: str, obj: Any, expiration: int = None) -> bool:
+        try:
+            with redis_guard():
+                pubsub = get_cache_backend().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: handle_message})
+        except CacheUnavailable as e:
+            current_logger.warning(f"Cannot subscribe to cache invalidations: {e}")
+            return
+        # Anything cached before the subscription may already be stale
+        local_cache.clear()
+        _invalidation_listeners[pid] = pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=handle_error
+        )
+
+
+def _current_identity() -> Any:
     """
-    Cache complex Python objects using pickle
+    Get the JWT identity of the current request, or None
     """
-    if expiration is None:
-        expiration = get_default_expiration()
-    pickled_obj = pickle.dumps(obj)
-    return get_redis_client(decode_responses=False).setex(key, expiration, pickled_obj)
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # The JWT has not been verified yet for this request
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+
+
+def _resolve_identity() -> str:
+    """
+    Get the JWT identity of the current request, or "anonymous"
+    """
+    identity = _current_identity()
+    return str(identity) if identity is not None else "anonymous"
+
+
+@lru_cache(maxsize=None)
+def _prefix_fields(prefix: str) -> frozenset:
+    return frozenset(name for _, name, _, _ in Formatter().parse(prefix) if name)
+
 
+@lru_cache(maxsize=None)
+def _takes_self(func: Callable) -> bool:
+    parameters = list(inspect.signature(func).parameters)
+    return bool(parameters) and parameters[0] in ("self", "cls")
 
-def get_complex_object(key: str) -> Any:
+
+def resolve_namespace(prefix: str, kwargs: Dict[str, Any]) -> str:
+    """
+    Fill the named placeholders of a cache prefix
+
+    "{identity}" resolves to the JWT identity of the current request; every
+    other placeholder is taken from the route kwargs, so
+    "customer:request:{request_id}:{identity}" becomes "customer:request:7:42".
+    """
+    fields = _prefix_fields(prefix)
+    if not fields:
+        return prefix
+
+    values = {name: kwargs[name] for name in fields if name in kwargs}
+    if "identity" in fields:
+        values["identity"] = _resolve_identity()
+
+    missing = fields - values.keys()
+    if missing:
+        raise KeyError(f"Cannot resolve cache prefix {prefix!r}: missing {missing}")
+    return prefix.format(**values)
+
+
+def _cache_key_parts(
+    prefix: str,
+    func: Callable,
+    args: Tuple,
+    kwargs: Dict[str, Any],
+    args_as_key: bool = False,
+) -> Tuple[str, List[str]]:
     """
-    Retrieve a complex object from cache
+    Split a call of a cached function into its namespace and key parts
+
+    The bound instance (self) never takes part in the key, route kwargs that
+    are not used by the prefix are added as sorted name=value pairs, and
+    query parameters are sorted so that ?a=1&b=2 and ?b=2&a=1 share an entry.
     """
-    pickled_obj = get_redis_client(decode_responses=False).get(key)
-    if pickled_obj:
-        return pickle.loads(pickled_obj)
+    namespace = resolve_namespace(prefix, kwargs)
+    fields = _prefix_fields(prefix)
+
+    key_parts = [func.__name__]
+    if args_as_key:
+        if args and _takes_self(func):
+            args = args[1:]
+        key_parts += [str(arg) for arg in args]
+        key_parts += [
+            f"{name}={kwargs[name]}" for name in sorted(kwargs) if name not in fields
+        ]
+
+    # For API endpoints, add request path and normalized query params to the key
+    if has_request_context():
+        query_string = urlencode(sorted(request.args.items(multi=True)))
+        if query_string:
+            key_parts.append(f"{request.path}?{query_string}")
+        else:
+            key_parts.append(request.path)
+
+    return namespace, key_parts
+
+
+# cache_result stores each entry as one line of JSON metadata followed by the
+# payload, framed by pack_value. The metadata holds the logical expiry "e"
+# (epoch seconds), the time "d" the value took to compute and, for cached
+# responses, the status "s" and headers "h". The payload is the serialized
+# value, or the response body verbatim. The physical Redis TTL may outlive
+# "e" so that a stale value can be served while a single caller recomputes it.
+def _read_entry(key: str, response: bool = False) -> Optional[Dict[str, Any]]:
+    blob = get_raw_cache(key)
+    if blob is None:
+        return None
+    try:
+        data, serializer = unpack_value(blob)
+        meta, payload = data.split(b"\n", 1)
+        entry = json.loads(meta)
+        entry["value"] = payload if response else deserialize_value(payload, serializer)
+    except ValueError:
+        return None
+    entry["size"] = len(blob)
+    return entry
+
+
+def _write_entry(
+    key: str,
+    entry: Dict[str, Any],
+    payload: bytes,
+    serializer: int,
+    expiration: int,
+    grace: int = 0,
+) -> Dict[str, Any]:
+    blob = pack_value(json.dumps(entry).encode() + b"\n" + payload, serializer)
+    try:
+        set_raw_cache(key, blob, expiration + grace)
+    except CacheUnavailable:
+        return None
+    entry["size"] = len(blob)
+    return entry
+
+
+def _render_response(result: Any) -> Response:
+    """
+    Serialize a view result the way Flask-RESTX would for application/json
+    """
+    if isinstance(result, Response):
+        return result
+    data, code, headers = unpack(result)
+    resp = output_json(data, code, headers)
+    # Api.make_response would set this from the negotiated media type
+    resp.headers["Content-Type"] = "application/json"
+    return resp
+
+
+def _set_etag(resp: Response, payload: bytes) -> None:
+    # Strong validator from the body itself, so a recomputed but unchanged
+    # result keeps its ETag across invalidations
+    resp.set_etag(hashlib.blake2b(payload, digest_size=16).hexdigest())
+    resp.headers["Cache-Control"] = "private, no-cache"
+
+
+def etag_response(func: Callable) -> Callable:
+    """
+    Decorator that tags a view's JSON response with an ETag of its body and
+    answers a matching If-None-Match with an empty 304
+
+    For views that are not cached with cache_result(response=True), which
+    does this itself. Place it above marshal_with.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        resp = _render_response(func(*args, **kwargs))
+        if resp.status_code != 200 or resp.direct_passthrough:
+            return resp
+        _set_etag(resp, resp.get_data())
+        return _not_modified(resp.headers) or resp
+
+    return wrapper
+
+
+def _store_result(
+    key: str,
+    result: Any,
+    response: bool,
+    expiration: int,
+    delta: float,
+    grace: int,
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """
+    Cache a freshly computed result; returns what the caller should return
+    and the stored entry (None if it could not be cached)
+    """
+    entry = {"e": time.time() + expiration, "d": delta}
+    started = time.perf_counter()
+    if response:
+        result = _render_response(result)
+        # Only plain successful JSON bodies are worth replaying
+        if result.status_code != 200 or result.direct_passthrough:
+            return result, None
+        payload = result.get_data()
+        _set_etag(result, payload)
+        entry["s"] = result.status_code
+        entry["h"] = {
+            "Content-Type": result.content_type,
+            "ETag": result.headers["ETag"],
+            "Cache-Control": result.headers["Cache-Control"],
+        }
+        record_cache_metrics(key, serialize_seconds=time.perf_counter() - started)
+        entry = _write_entry(key, entry, payload, SERIALIZER_RAW, expiration, grace)
+        if entry is not None:
+            entry["value"] = payload
+        return _not_modified(result.headers) or result, entry
+
+    try:
+        payload, serializer = serialize_value(result)
+    except SERIALIZE_ERRORS as e:
+        # If serialization fails, log it but continue without caching
+        current_app.logger.warning(f"Failed to cache result for {key}: {str(e)}")
+        return result, None
+    record_cache_metrics(key, serialize_seconds=time.perf_counter() - started)
+    entry = _write_entry(key, entry, payload, serializer, expiration, grace)
+    if entry is not None:
+        # Hand back what a cache hit would return
+        entry["value"] = deserialize_value(payload, serializer)
+    return result, entry
+
+
+def _not_modified(headers: Dict[str, str]) -> Optional[Response]:
+    """
+    Build an empty 304 if the request's If-None-Match has the given ETag
+    """
+    etag = headers.get("ETag")
+    if etag is None or not has_request_context():
+        return None
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if not request.if_none_match.contains(unquote_etag(etag)[0]):
+        return None
+    return current_app.response_class(
+        status=304,
+        headers={
+            name: headers[name] for name in ("ETag", "Cache-Control") if name in headers
+        },
+    )
+
+
+def _store_not_found(
+    key: str, error: NotFound, delta: float
+) -> Optional[Dict[str, Any]]:
+    """
+    Cache the fact that a lookup raised NotFound, with its description
+    """
+    expiration = current_app.config.get("CACHE_NOT_FOUND_TTL", 60)
+    if expiration <= 0:
+        return None
+    entry = {"e": time.time() + expiration, "d": delta, "nf": error.description}
+    entry = _write_entry(key, entry, b"", SERIALIZER_RAW, expiration)
+    if entry is not None:
+        entry["value"] = None
+    return entry
+
+
+def _entry_result(entry: Dict[str, Any], response: bool) -> Any:
+    if "nf" in entry:
+        raise NotFound(entry["nf"])
+    if response:
+        # The client already has this body, so send none at all
+        not_modified = _not_modified(entry["h"])
+        if not_modified is not None:
+            return not_modified
+        # Replay the stored body without touching marshalling or json.dumps
+        return current_app.response_class(
+            entry["value"], status=entry["s"], headers=entry["h"]
+        )
+    return entry["value"]
+
+
+def _is_fresh(entry: Dict[str, Any], now: float, beta: float) -> bool:
+    """
+    Check an entry against its expiry, with XFetch probabilistic early expiry
+
+    With beta > 0 a caller occasionally treats the entry as expired shortly
+    before it really is; the slower the value is to compute, the earlier
+    that starts, so hot keys are refreshed before they ever expire.
+    """
+    if beta <= 0:
+        return now < entry["e"]
+    return now - entry["d"] * beta * math.log(1.0 - random.random()) < entry["e"]
+
+
+def _wait_for_entry(
+    key: str, response: bool, timeout: float
+) -> Optional[Dict[str, Any]]:
+    """
+    Poll for an entry that another caller is recomputing
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            entry = _read_entry(key, response)
+        except CacheUnavailable:
+            return None
+        if entry is not None:
+            return entry
     return None
+
+
+def _acquire_lock(key: str, timeout: int) -> Optional[Any]:
+    """
+    Take the recompute lock of an entry, or return None if someone holds it
+    """
+    lock = get_cache_backend().lock(f"{key}:lock", timeout=timeout, blocking=False)
+    with redis_guard():
+        return lock if lock.acquire() else None
+
+
+def _release_lock(lock: Any) -> None:
+    try:
+        with redis_guard():
+            try:
+                lock.release()
+            except LockError:
+                # The lock timed out and may now belong to someone else
+                pass
+    except CacheUnavailable:
+        # It expires after CACHE_LOCK_TIMEOUT
+        pass
+
+
+# Functions cached with a hard_expiration, by dotted name, so that a Celery
+# worker can recompute their stale entries (see refresh_cached_result)
+_refreshable: Dict[str, Tuple[Callable, Dict[str, Any]]] = {}
+
+
+def _refresh_target(func: Callable) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def _schedule_refresh(
+    target: str, key: str, args: Tuple, kwargs: Dict[str, Any]
+) -> None:
+    """
+    Queue a background recomputation of a stale entry, at most one per key
+    """
+    client = get_cache_backend()
+    marker = f"{key}:refresh"
+    timeout = current_app.config.get("CACHE_REFRESH_TIMEOUT", 60)
+    try:
+        with redis_guard():
+            if not client.set(marker, 1, nx=True, ex=timeout):
+                # A refresh is already queued or running
+                return
+    except CacheUnavailable:
+        return
+
+    path, query_string, identity = None, "", None
+    if has_request_context():
+        path = request.path
+        query_string = request.query_string.decode()
+        identity = _current_identity()
+
+    try:
+        if client.shared:
+            refresh_cache_task.delay(
+                target, key, path, query_string, identity, list(args), kwargs
+            )
+        else:
+            # A Celery worker would refresh its own in-process cache, not ours
+            app = current_app._get_current_object()
+
+            def refresh():
+                with app.app_context():
+                    refresh_cached_result(
+                        target, key, path, query_string, identity, list(args), kwargs
+                    )
+
+            threading.Thread(target=refresh, daemon=True).start()
+    except Exception as e:
+        # Keep serving the stale value; the next request will try again
+        try:
+            with redis_guard():
+                client.delete(marker)
+        except CacheUnavailable:
+            # The marker expires after CACHE_REFRESH_TIMEOUT instead
+            pass
+        current_app.logger.warning(f"Failed to queue refresh for {key}: {str(e)}")
+
+
+def refresh_cached_result(
+    target: str,
+    key: str,
+    path: Optional[str],
+    query_string: str,
+    identity: Any,
+    args: List[Any],
+    kwargs: Dict[str, Any],
+) -> bool:
+    """
+    Recompute a stale cache_result entry and rewrite it in place
+
+    Runs the cached function in a request context rebuilt from the original
+    path, query string and JWT identity, so that route kwargs, request.args
+    and get_jwt_identity() behave as they did for the caller.
+    """
+    try:
+        func, options = _refreshable[target]
+        headers = {}
+        if identity is not None:
+            token = create_access_token(identity=identity)
+            headers["Authorization"] = f"Bearer {token}"
+
+        with current_app.test_request_context(
+            path or "/", query_string=query_string, headers=headers
+        ):
+            if identity is not None:
+                verify_jwt_in_request()
+            if _takes_self(func):
+                # Route handlers are Resource methods; any instance will do
+                owner = sys.modules[func.__module__]
+                for name in func.__qualname__.split(".")[:-1]:
+                    owner = getattr(owner, name)
+                args = [owner(), *args]
+
+            started = time.monotonic()
+            result = func(*args, **kwargs)
+            delta = time.monotonic() - started
+
+            expiration = options["expiration"]
+            if expiration is None:
+                expiration = get_default_expiration()
+            grace = max(options["hard_expiration"] - expiration, 0)
+            namespace = _VERSION_SEGMENT.split(key, 1)[0]
+            expiration = resolve_expiration(options["prefix"], namespace, expiration)
+            _, entry = _store_result(
+                key, result, options["response"], expiration, delta, grace
+            )
+        return entry is not None
+    finally:
+        try:
+            with redis_guard():
+                get_cache_backend().delete(f"{key}:refresh")
+        except CacheUnavailable:
+            # The marker expires on its own
+            pass
+
+
+def cache_result(
+    prefix: str,
+    expiration: int = None,
+    args_as_key: bool = False,
+    local: bool = False,
+    single_flight: bool = False,
+    early_expiration: float = 0,
+    response: bool = False,
+    hard_expiration: int = None,
+    cache_not_found: bool = False,
+):
+    """
+    Decorator to cache function results
+
+    Args:
+        prefix: Prefix for the cache key; also the namespace passed to
+            invalidate_namespace() to drop these entries. May contain named
+            placeholders such as "{identity}" or route kwargs like
+            "{request_id}" (see resolve_namespace)
+        expiration: Cache expiration time in seconds (default from config).
+            A CACHE_TTL_POLICIES entry for the prefix overrides it, and
+            adaptive TTLs adjust it (see resolve_expiration); the
+            hard_expiration grace period is kept as is
+        args_as_key: Whether to include positional arguments (other than
+            self) and route kwargs not used by the prefix in the cache key
+        local: Whether to also keep results in this worker's in-process L1
+            cache, for hot reads that rarely change
+        single_flight: Whether only one caller at a time may recompute an
+            expired entry. The others serve the stale value while it is kept
+            (CACHE_STALE_GRACE) or wait up to CACHE_LOCK_WAIT seconds for it
+        early_expiration: XFetch beta; values above 0 refresh entries
+            probabilistically before they expire (1.0 is a good default)
+        response: Whether to cache the final serialized JSON response
+            (body, status and headers) and replay it on a hit. Place the
+            decorator above marshal_with so the marshalled output is cached.
+            Responses carry an ETag of their body, and a GET whose
+            If-None-Match matches it gets an empty 304 instead
+        hard_expiration: Enables stale-while-revalidate. expiration becomes
+            the soft TTL; until hard_expiration seconds have passed a stale
+            entry is still returned at once while a Celery task recomputes
+            and rewrites it in the background
+        cache_not_found: Whether to also remember, for CACHE_NOT_FOUND_TTL
+            seconds, that the function raised NotFound (e.g. get_or_404) and
+            raise it again without calling it. The entry goes when the
+            namespace is invalidated, e.g. by creating the missing row
+    """
+
+    def decorator(func):
+        target = _refresh_target(func)
+        if hard_expiration is not None:
+            _refreshable[target] = (
+                func,
+                {
+                    "prefix": prefix,
+                    "expiration": expiration,
+                    "hard_expiration": hard_expiration,
+                    "response": response,
+                },
+            )
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            namespace, key_parts = _cache_key_parts(
+                prefix, func, args, kwargs, args_as_key
+            )
+
+            local_cache = get_local_cache() if local else None
+            if local_cache is not None:
+                local_key = ":".join([namespace, *key_parts])
+                hit, entry = local_cache.get(local_key)
+                # Never serve a copy past the expiry of the entry it was taken from
+                if hit and time.time() < entry["e"]:
+                    record_cache_metrics(namespace, hits=1, l1_hits=1)
+                    return _entry_result(entry, response)
+                generation = local_cache.generation
+
+            app_config = current_app.config
+            exp = get_default_expiration() if expiration is None else expiration
+            if hard_expiration is not None:
+                grace = max(hard_expiration - exp, 0)
+            elif single_flight:
+                grace = app_config.get("CACHE_STALE_GRACE", 30)
+            else:
+                grace = 0
+
+            try:
+                apply_deferred_invalidations()
+                # Try to get from cache
+                key = namespaced_key(namespace, *key_parts)
+                entry = _read_entry(key, response)
+            except CacheUnavailable:
+                # Redis is down or the breaker is open: go straight to the source
+                record_cache_metrics(namespace, bypassed=1)
+                return func(*args, **kwargs)
+            if entry is not None and _is_fresh(entry, time.time(), early_expiration):
+                if local_cache is not None:
+                    local_cache.set(
+                        local_key, namespace, entry, entry["size"], generation
+                    )
+                record_cache_metrics(namespace, hits=1)
+                return _entry_result(entry, response)
+
+            if entry is not None and hard_expiration is not None:
+                # Past the soft TTL: answer now, recompute in the background
+                record_cache_metrics(namespace, hits=1, stale_hits=1)
+                if _takes_self(func):
+                    _schedule_refresh(target, key, args[1:], kwargs)
+                else:
+                    _schedule_refresh(target, key, args, kwargs)
+                return _entry_result(entry, response)
+
+            lock = None
+            if single_flight:
+                try:
+                    lock = _acquire_lock(key, app_config.get("CACHE_LOCK_TIMEOUT", 10))
+                    contended = lock is None
+                except CacheUnavailable:
+                    # Nobody could store the result anyway; just compute it
+                    contended = False
+                if contended:
+                    # Someone else is recomputing; serve what we have or wait
+                    if entry is None:
+                        entry = _wait_for_entry(
+                            key, response, app_config.get("CACHE_LOCK_WAIT", 2)
+                        )
+                    if entry is not None:
+                        record_cache_metrics(namespace, hits=1, stale_hits=1)
+                        return _entry_result(entry, response)
+
+            try:
+                # Call the function
+                started = time.monotonic()
+                try:
+                    result = func(*args, **kwargs)
+                except NotFound as e:
+                    if cache_not_found:
+                        delta = time.monotonic() - started
+                        record_cache_metrics(
+                            namespace, misses=1, not_found=1, compute_seconds=delta
+                        )
+                        entry = _store_not_found(key, e, delta)
+                        if entry is not None and local_cache is not None:
+                            local_cache.set(
+                                local_key, namespace, entry, entry["size"], generation
+                            )
+                    raise
+                delta = time.monotonic() - started
+                record_cache_metrics(namespace, misses=1, compute_seconds=delta)
+
+                result, entry = _store_result(
+                    key,
+                    result,
+                    response,
+                    resolve_expiration(prefix, namespace, exp),
+                    delta,
+                    grace,
+                )
+            finally:
+                if lock is not None:
+                    _release_lock(lock)
+
+            if entry is not None and local_cache is not None:
+                local_cache.set(local_key, namespace, entry, entry["size"], generation)
+
+            return result
+
+        return wrapper
+
+    return decorator
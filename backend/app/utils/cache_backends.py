@@ -0,0 +1,653 @@
+import fnmatch
+import math
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import redis
+from redis.exceptions import LockError, LockNotOwnedError, ResponseError
+
+WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+TYPE_NAMES = {bytes: "string", dict: "hash", set: "set"}
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind the cache: the subset of the redis-py client API it uses
+
+    That is the string and key commands of cache entries, hashes and sets for
+    metrics, locks for single flight, pub/sub for invalidations (only on
+    shared backends) and the introspection commands of the admin tools.
+
+    Keys are str. Values are returned as bytes, or as str by backends
+    created with decode_responses=True, exactly as redis-py does.
+    """
+
+    # Whether every worker sees the same data, so that invalidations can be
+    # published to the others and background jobs can refresh entries
+    shared = True
+
+    @abstractmethod
+    def get(self, name: str) -> Any: ...
+
+    @abstractmethod
+    def mget(self, keys: Union[str, List[str]], *args: str) -> List[Any]: ...
+
+    @abstractmethod
+    def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]: ...
+
+    @abstractmethod
+    def setex(self, name: str, time: int, value: Any) -> bool: ...
+
+    @abstractmethod
+    def delete(self, *names: str) -> int: ...
+
+    @abstractmethod
+    def unlink(self, *names: str) -> int: ...
+
+    @abstractmethod
+    def exists(self, *names: str) -> int: ...
+
+    @abstractmethod
+    def expire(self, name: str, time: int) -> bool: ...
+
+    @abstractmethod
+    def ttl(self, name: str) -> int: ...
+
+    @abstractmethod
+    def incr(self, name: str, amount: int = 1) -> int: ...
+
+    @abstractmethod
+    def strlen(self, name: str) -> int: ...
+
+    @abstractmethod
+    def type(self, name: str) -> Any: ...
+
+    @abstractmethod
+    def scan(
+        self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None
+    ) -> Tuple[int, List[Any]]: ...
+
+    @abstractmethod
+    def scan_iter(
+        self, match: Optional[str] = None, count: Optional[int] = None
+    ) -> Iterator[Any]: ...
+
+    @abstractmethod
+    def dbsize(self) -> int: ...
+
+    @abstractmethod
+    def memory_usage(
+        self, key: str, samples: Optional[int] = None
+    ) -> Optional[int]: ...
+
+    @abstractmethod
+    def info(self, section: Optional[str] = None) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int: ...
+
+    @abstractmethod
+    def hincrbyfloat(self, name: str, key: str, amount: float = 1.0) -> float: ...
+
+    @abstractmethod
+    def hgetall(self, name: str) -> Dict[Any, Any]: ...
+
+    @abstractmethod
+    def sadd(self, name: str, *values: Any) -> int: ...
+
+    @abstractmethod
+    def smembers(self, name: str) -> set: ...
+
+    @abstractmethod
+    def publish(self, channel: str, message: Any) -> int: ...
+
+    @abstractmethod
+    def pubsub(self, **kwargs: Any) -> Any: ...
+
+    @abstractmethod
+    def pipeline(self, transaction: bool = True) -> Any: ...
+
+    @abstractmethod
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any: ...
+
+
+class RedisBackend(redis.Redis, CacheBackend):
+    """
+    Redis, shared by every worker (the default)
+    """
+
+
+class MemoryStore:
+    """
+    The data of an in-process backend: strings, hashes and sets with
+    Redis-style expiry, evicting the least recently used keys past max_keys
+
+    Keys starting with one of pinned_prefixes are never evicted, only
+    expired or deleted.
+    """
+
+    def __init__(self, max_keys: int = 100000, pinned_prefixes: Tuple[str, ...] = ()):
+        self.max_keys = max_keys
+        self.pinned_prefixes = pinned_prefixes
+        self.data: "OrderedDict[str, Any]" = OrderedDict()
+        self.expires: Dict[str, float] = {}
+        self.lock = threading.RLock()
+        self.started = time.time()
+
+    def lookup(self, name: str) -> Any:
+        if name not in self.data:
+            return None
+        expires = self.expires.get(name)
+        if expires is not None and expires <= time.monotonic():
+            self.remove(name)
+            return None
+        self.data.move_to_end(name)
+        return self.data[name]
+
+    def store(self, name: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.data[name] = value
+        self.data.move_to_end(name)
+        if ttl is None:
+            self.expires.pop(name, None)
+        else:
+            self.expires[name] = time.monotonic() + ttl
+        for _ in range(len(self.data)):
+            if len(self.data) <= self.max_keys:
+                break
+            oldest = next(iter(self.data))
+            if oldest.startswith(self.pinned_prefixes):
+                self.data.move_to_end(oldest)
+            else:
+                self.remove(oldest)
+
+    def remove(self, name: str) -> bool:
+        self.expires.pop(name, None)
+        return self.data.pop(name, None) is not None
+
+    def live_keys(self, match: Optional[str] = None) -> List[str]:
+        now = time.monotonic()
+        for name in [n for n, expires in self.expires.items() if expires <= now]:
+            self.remove(name)
+        keys = sorted(self.data)
+        if match is not None and match != "*":
+            keys = [key for key in keys if fnmatch.fnmatchcase(key, match)]
+        return keys
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode()
+    raise redis.DataError(f"Invalid input of type: '{type(value).__name__}'")
+
+
+def _value_size(value: Any) -> int:
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(field) + len(v) for field, v in value.items())
+    return sum(len(member) for member in value)
+
+
+def _scan_slot(key: str) -> int:
+    return zlib.crc32(key.encode())
+
+
+def _human_bytes(size: float) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size:.2f}{unit}" if unit != "B" else f"{int(size)}B"
+        size /= 1024
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process storage for single-node deployments, tests and benchmarks
+
+    Nothing is shared between workers. Besides the CacheBackend interface
+    it implements the hash, set, lock and introspection commands used by
+    cache metrics and the admin tools.
+    """
+
+    shared = False
+
+    def __init__(self, store: MemoryStore, decode_responses: bool = False):
+        self._store = store
+        self._decode = decode_responses
+
+    def _out(self, value: Optional[bytes]) -> Any:
+        if value is None or not self._decode:
+            return value
+        return value.decode()
+
+    def _key_out(self, name: str) -> Any:
+        return name if self._decode else name.encode()
+
+    def _typed(self, name: str, kind: type) -> Any:
+        value = self._store.lookup(name)
+        if value is not None and not isinstance(value, kind):
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    # Strings
+
+    def get(self, name: str) -> Any:
+        with self._store.lock:
+            return self._out(self._typed(name, bytes))
+
+    def mget(self, keys: Union[str, List[str]], *args: str) -> List[Any]:
+        names = [keys, *args] if isinstance(keys, str) else [*keys, *args]
+        with self._store.lock:
+            values = [self._store.lookup(name) for name in names]
+        return [self._out(v) if isinstance(v, bytes) else None for v in values]
+
+    def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]:
+        ttl = ex if ex is not None else px / 1000 if px is not None else None
+        with self._store.lock:
+            exists = self._store.lookup(name) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._store.store(name, _encode(value), ttl)
+        return True
+
+    def setex(self, name: str, time: int, value: Any) -> bool:
+        return self.set(name, value, ex=time)
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._store.lock:
+            current = self._typed(name, bytes)
+            try:
+                value = int(current or 0) + amount
+            except ValueError:
+                raise ResponseError("value is not an integer or out of range")
+            # INCR keeps the key's TTL
+            expires = self._store.expires.get(name)
+            ttl = None if expires is None else expires - time.monotonic()
+            self._store.store(name, str(value).encode(), ttl)
+        return value
+
+    incrby = incr
+
+    def strlen(self, name: str) -> int:
+        with self._store.lock:
+            value = self._typed(name, bytes)
+        return len(value) if value is not None else 0
+
+    # Keys
+
+    def delete(self, *names: str) -> int:
+        with self._store.lock:
+            return sum(
+                1
+                for name in names
+                if self._store.lookup(name) is not None and self._store.remove(name)
+            )
+
+    unlink = delete
+
+    def exists(self, *names: str) -> int:
+        with self._store.lock:
+            return sum(1 for name in names if self._store.lookup(name) is not None)
+
+    def expire(self, name: str, time: int) -> bool:
+        with self._store.lock:
+            value = self._store.lookup(name)
+            if value is None:
+                return False
+            self._store.store(name, value, time)
+        return True
+
+    def ttl(self, name: str) -> int:
+        with self._store.lock:
+            if self._store.lookup(name) is None:
+                return -2
+            expires = self._store.expires.get(name)
+        if expires is None:
+            return -1
+        return math.ceil(expires - time.monotonic())
+
+    def type(self, name: str) -> Any:
+        with self._store.lock:
+            value = self._store.lookup(name)
+        kind = "none" if value is None else TYPE_NAMES[type(value)]
+        return self._out(kind.encode())
+
+    def scan(
+        self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None
+    ) -> Tuple[int, List[Any]]:
+        # Keys are visited in order of a slot fixed by their name, and a page
+        # always ends with the whole slot of its last key. The cursor is the
+        # slot after it, so a key present for the whole scan is returned
+        # exactly once however many others come and go meanwhile.
+        count = count or 10
+        with self._store.lock:
+            remaining = []
+            for key in self._store.live_keys():
+                slot = _scan_slot(key)
+                if slot >= cursor:
+                    remaining.append((slot, key))
+        remaining.sort()
+        if len(remaining) <= count:
+            page, cursor = remaining, 0
+        else:
+            last_slot = remaining[count - 1][0]
+            end = count
+            while end < len(remaining) and remaining[end][0] == last_slot:
+                end += 1
+            page, cursor = remaining[:end], last_slot + 1
+        keys = [key for _, key in page]
+        if match is not None and match != "*":
+            keys = [key for key in keys if fnmatch.fnmatchcase(key, match)]
+        return cursor, [self._key_out(key) for key in keys]
+
+    def scan_iter(
+        self, match: Optional[str] = None, count: Optional[int] = None
+    ) -> Iterator[Any]:
+        with self._store.lock:
+            keys = self._store.live_keys(match)
+        for key in keys:
+            yield self._key_out(key)
+
+    def dbsize(self) -> int:
+        with self._store.lock:
+            return len(self._store.live_keys())
+
+    def flushdb(self) -> bool:
+        with self._store.lock:
+            self._store.data.clear()
+            self._store.expires.clear()
+        return True
+
+    def memory_usage(self, key: str, samples: Optional[int] = None) -> Optional[int]:
+        with self._store.lock:
+            value = self._store.lookup(key)
+        if value is None:
+            return None
+        # Rough per-key overhead of a dict slot, the key and the value object
+        return len(key) + _value_size(value) + 64
+
+    def info(self, section: Optional[str] = None) -> Dict[str, Any]:
+        with self._store.lock:
+            keys = self._store.live_keys()
+            used = sum(self.memory_usage(key) or 0 for key in keys)
+        return {
+            "used_memory": used,
+            "used_memory_human": _human_bytes(used),
+            "connected_clients": 0,
+            "uptime_in_seconds": int(time.time() - self._store.started),
+            "uptime_in_days": int((time.time() - self._store.started) // 86400),
+            "maxmemory_policy": "allkeys-lru",
+        }
+
+    # Hashes and sets
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._store.lock:
+            fields = self._typed(name, dict)
+            if fields is None:
+                fields = {}
+                self._store.store(name, fields)
+            value = int(fields.get(key, b"0")) + amount
+            fields[key] = str(value).encode()
+        return value
+
+    def hincrbyfloat(self, name: str, key: str, amount: float = 1.0) -> float:
+        with self._store.lock:
+            fields = self._typed(name, dict)
+            if fields is None:
+                fields = {}
+                self._store.store(name, fields)
+            value = float(fields.get(key, b"0")) + amount
+            fields[key] = repr(value).encode()
+        return value
+
+    def hgetall(self, name: str) -> Dict[Any, Any]:
+        with self._store.lock:
+            fields = dict(self._typed(name, dict) or {})
+        return {self._key_out(key): self._out(value) for key, value in fields.items()}
+
+    def sadd(self, name: str, *values: Any) -> int:
+        with self._store.lock:
+            members = self._typed(name, set)
+            if members is None:
+                members = set()
+                self._store.store(name, members)
+            before = len(members)
+            members.update(_encode(value) for value in values)
+        return len(members) - before
+
+    def smembers(self, name: str) -> set:
+        with self._store.lock:
+            members = set(self._typed(name, set) or ())
+        return {self._out(member) for member in members}
+
+    def publish(self, channel: str, message: Any) -> int:
+        # Nobody else shares this memory, so there is nobody to tell
+        return 0
+
+    def pubsub(self, **kwargs: Any) -> "MemoryPubSub":
+        return MemoryPubSub()
+
+    # Pipelines and locks
+
+    def pipeline(self, transaction: bool = True) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> "MemoryLock":
+        return MemoryLock(self, name, timeout, sleep, blocking, blocking_timeout)
+
+
+class MemoryPipeline:
+    """
+    Queues commands and runs them together, atomically, on execute()
+    """
+
+    def __init__(self, backend: MemoryBackend):
+        self._backend = backend
+        self._commands = []
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._backend, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __enter__(self) -> "MemoryPipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        commands, self._commands = self._commands, []
+        results = []
+        with self._backend._store.lock:
+            for method, args, kwargs in commands:
+                try:
+                    results.append(method(*args, **kwargs))
+                except ResponseError as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+        return results
+
+
+class MemoryPubSub:
+    """
+    The redis-py PubSub protocol for a MemoryBackend: subscriptions are
+    accepted, but as nothing is published to other workers (see
+    MemoryBackend.publish) no message ever arrives
+    """
+
+    def __init__(self):
+        self.channels = {}
+        self.patterns = {}
+
+    def __enter__(self) -> "MemoryPubSub":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def subscribe(self, *args: Any, **kwargs: Any) -> None:
+        self.channels.update(dict.fromkeys(args), **kwargs)
+
+    def psubscribe(self, *args: Any, **kwargs: Any) -> None:
+        self.patterns.update(dict.fromkeys(args), **kwargs)
+
+    def unsubscribe(self, *args: Any) -> None:
+        for channel in args or list(self.channels):
+            self.channels.pop(channel, None)
+
+    def punsubscribe(self, *args: Any) -> None:
+        for pattern in args or list(self.patterns):
+            self.patterns.pop(pattern, None)
+
+    def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0.0
+    ) -> None:
+        if timeout:
+            time.sleep(timeout)
+        return None
+
+    def listen(self) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def run_in_thread(self, *args: Any, **kwargs: Any) -> "MemoryPubSubWorker":
+        return MemoryPubSubWorker()
+
+    def close(self) -> None:
+        self.channels.clear()
+        self.patterns.clear()
+
+    reset = close
+
+
+class MemoryPubSubWorker:
+    """
+    Stands in for the thread of PubSub.run_in_thread: there is nothing to run
+    """
+
+    def is_alive(self) -> bool:
+        return False
+
+    def stop(self) -> None:
+        pass
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        pass
+
+
+class MemoryLock:
+    """
+    The redis-py Lock protocol over a MemoryBackend key
+    """
+
+    def __init__(
+        self,
+        backend: MemoryBackend,
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: Optional[float] = None,
+    ):
+        self.backend = backend
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.local_token = None
+
+    def acquire(
+        self,
+        blocking: Optional[bool] = None,
+        blocking_timeout: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> bool:
+        blocking = self.blocking if blocking is None else blocking
+        if blocking_timeout is None:
+            blocking_timeout = self.blocking_timeout
+        token = _encode(token if token is not None else uuid.uuid1().hex)
+        px = int(self.timeout * 1000) if self.timeout else None
+        deadline = (
+            None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        )
+        while True:
+            if self.backend.set(self.name, token, px=px, nx=True):
+                self.local_token = token
+                return True
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(self.sleep)
+
+    def owned(self) -> bool:
+        with self.backend._store.lock:
+            stored = self.backend._store.lookup(self.name)
+        return self.local_token is not None and stored == self.local_token
+
+    def release(self) -> None:
+        token, self.local_token = self.local_token, None
+        if token is None:
+            raise LockError("Cannot release an unlocked lock")
+        with self.backend._store.lock:
+            if self.backend._store.lookup(self.name) != token:
+                raise LockNotOwnedError("Cannot release a lock that's no longer owned")
+            self.backend._store.remove(self.name)
+
+    def __enter__(self) -> "MemoryLock":
+        if self.acquire():
+            return self
+        raise LockError("Unable to acquire lock within the time specified")
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
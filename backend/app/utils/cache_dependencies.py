@@ -0,0 +1,205 @@
+from itertools import product
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from ..models import Document, Role, Service, ServiceRequest, User
+from .cache import defer_invalidation
+
+# Which cache namespaces depend on which rows. For every model, "scopes" maps
+# a namespace template, filled from the columns of the changed row, to the
+# columns whose update affects it (None: any column, (): none). Inserts and
+# deletes always count. When an update moves a foreign key, both the old and
+# the new value are used, so e.g. reassigning a request refreshes both
+# professionals.
+#
+# "related" maps models whose cached payloads embed this row to the columns
+# that matter and, for each foreign key that points at the row, the templates
+# of the payloads that embed it (a professional's activity feed shows their
+# customers). Changing those columns invalidates the templates for every row
+# that references it; they are filled from one SELECT DISTINCT per foreign
+# key, never by loading relationships inside the flush. Lists, which only
+# cache IDs (see entity_cache), are not among them.
+USER_DETAILS = (
+    "username",
+    "name",
+    "email",
+    "phone_number",
+    "address",
+    "profile_image",
+    "blocked",
+)
+SERVICE_DETAILS = ("name", "price", "time_required", "description")
+
+# Request lists only cache the IDs they contain (see entity_cache), so they
+# change when a request moves between lists, not when its details do
+REQUEST_REFS = ("customer_id", "professional_id", "service_id")
+
+CACHE_DEPENDENCIES: Dict[type, Dict[str, Dict[Any, Any]]] = {
+    ServiceRequest: {
+        "scopes": {
+            "admin:requests": REQUEST_REFS,
+            "admin:dashboard:stats": None,
+            "customer:requests:{customer_id}": REQUEST_REFS,
+            "customer:stats:{customer_id}": None,
+            "customer:activity:{customer_id}": None,
+            # Only pending requests are available
+            "professional:requests:available": (*REQUEST_REFS, "service_status"),
+            "professional:requests:assigned:{professional_id}": REQUEST_REFS,
+            "professional:dashboard:stats:{professional_id}": None,
+            "professional:dashboard:activity:{professional_id}": None,
+        },
+    },
+    User: {
+        "scopes": {
+            "customer:profile:{id}": None,
+            "professional:profile:{id}": None,
+            # Only matters when the account is created or deleted
+            "customer:requests:{id}": (),
+            "customer:stats:{id}": (),
+            "customer:activity:{id}": (),
+            "professional:requests:assigned:{id}": (),
+            "professional:documents:{id}": (),
+            "professional:dashboard:stats:{id}": (),
+            "professional:dashboard:activity:{id}": (),
+            "admin:dashboard:stats": ("name", "profile_image", "date_created"),
+        },
+        "related": {
+            ServiceRequest: (
+                USER_DETAILS,
+                {
+                    "customer_id": (
+                        "professional:dashboard:activity:{professional_id}",
+                    ),
+                    "professional_id": ("customer:activity:{customer_id}",),
+                },
+            ),
+        },
+    },
+    Service: {
+        "scopes": {
+            "service": None,
+            "admin:services": None,
+            "admin:service:{id}": None,
+            "admin:dashboard:stats": None,
+            # Dashboards embed service details. Catalog edits are rare and
+            # a service can have many requests, so drop whole scopes instead
+            # of walking them row by row
+            "customer:stats": SERVICE_DETAILS,
+            "customer:activity": SERVICE_DETAILS,
+            "professional:dashboard": SERVICE_DETAILS,
+        },
+    },
+    Document: {
+        "scopes": {
+            "admin:user:documents:{user_id}": None,
+            "professional:documents:{user_id}": None,
+        },
+    },
+    Role: {
+        "scopes": {
+            "admin:roles": None,
+            "admin:role:{id}": None,
+        },
+    },
+}
+
+
+def _column_values(obj: Any, key: str) -> Set[Any]:
+    """
+    Get the current and, for pending updates, previous values of a column
+    """
+    history = inspect(obj).attrs[key].history
+    values = set(history.added) | set(history.unchanged) | set(history.deleted)
+    if not values:
+        values = {getattr(obj, key)}
+    values.discard(None)
+    return values
+
+
+def _changed(obj: Any, columns: Optional[Iterable[str]]) -> bool:
+    if columns is None:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+def _template_fields(template: str) -> List[str]:
+    return [name for _, name, _, _ in Formatter().parse(template) if name]
+
+
+def _expand(template: str, values: Callable[[str], Set[Any]]) -> List[str]:
+    fields = _template_fields(template)
+    # Scopes keyed by a NULL column (an unassigned request) do not exist
+    return [
+        template.format(**dict(zip(fields, combination)))
+        for combination in product(*(values(name) for name in fields))
+    ]
+
+
+def _related_scopes(
+    session: Session, obj: Any, model: type, templates: Dict[str, Iterable[str]]
+) -> List[str]:
+    """
+    Expand, for every foreign key of model that points at obj, its templates
+    with the distinct values of the rows that reference obj through it
+    """
+    namespaces = {}
+    for foreign_key, key_templates in templates.items():
+        fields = sorted(
+            {name for template in key_templates for name in _template_fields(template)}
+        )
+        query = (
+            select(*(getattr(model, name) for name in fields))
+            .where(getattr(model, foreign_key) == obj.id)
+            .distinct()
+        )
+        # On the connection, so that the query cannot autoflush mid-flush
+        for row in session.connection().execute(query):
+            values = dict(zip(fields, row))
+            for template in key_templates:
+                namespaces.update(
+                    dict.fromkeys(
+                        _expand(template, lambda name: {values[name]} - {None})
+                    )
+                )
+    return list(namespaces)
+
+
+def _scopes_for(session: Session, obj: Any, updated: bool) -> List[str]:
+    """
+    Expand the namespace templates registered for a row
+    """
+    dependencies = CACHE_DEPENDENCIES.get(type(obj))
+    if dependencies is None:
+        return []
+
+    namespaces = []
+    for template, columns in dependencies["scopes"].items():
+        if updated and not _changed(obj, columns):
+            continue
+        namespaces.extend(_expand(template, lambda name: _column_values(obj, name)))
+
+    if updated:
+        for model, (columns, templates) in dependencies.get("related", {}).items():
+            if _changed(obj, columns):
+                namespaces.extend(_related_scopes(session, obj, model, templates))
+    return namespaces
+
+
+@event.listens_for(Session, "after_flush")
+def _record_cache_dependencies(session, flush_context) -> None:
+    """
+    Work out which namespaces the flushed rows invalidate; they are applied
+    once the transaction commits and dropped if it rolls back
+    """
+    for obj in session.new:
+        for namespace in _scopes_for(session, obj, updated=False):
+            defer_invalidation(session, namespace)
+    for obj in session.deleted:
+        for namespace in _scopes_for(session, obj, updated=False):
+            defer_invalidation(session, namespace)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            for namespace in _scopes_for(session, obj, updated=True):
+                defer_invalidation(session, namespace)
@@ -1,90 +1,362 @@
-from typing import Dict, List, Optional, Tuple
+import heapq
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from flask import current_app
-from .cache import get_redis_client
+from .cache import (
+    METRICS_INDEX,
+    METRICS_PREFIX,
+    NAMESPACE_VERSION_PREFIX,
+    NAMESPACE_WRITES_PREFIX,
+    CacheUnavailable,
+    count_deferred_invalidations,
+    delete_pattern,
+    get_cache_backend,
+    get_circuit_breaker,
+    get_metrics_recorder,
+    metrics_prefix,
+    redis_guard,
+)
 
 
-def get_cache_stats() -> Dict[str, int]:
-    client = get_redis_client()
-    info = client.info()
+def get_cache_stats() -> Dict[str, Any]:
     stats = {
-        "total_keys": client.dbsize(),
-        "used_memory_human": info.get("used_memory_human", ""),
-        "connected_clients": info.get("connected_clients", 0),
-        "uptime_in_days": info.get("uptime_in_days", 0),
+        "backend": current_app.config.get("CACHE_BACKEND", "redis"),
+        "available": True,
+        "circuit_breaker": get_circuit_breaker().info(),
+        "deferred_invalidations": count_deferred_invalidations(),
     }
+    try:
+        with redis_guard():
+            client = get_cache_backend()
+            info = client.info()
+            stats.update(
+                {
+                    "total_keys": client.dbsize(),
+                    "used_memory_human": info.get("used_memory_human", ""),
+                    "connected_clients": info.get("connected_clients", 0),
+                    "uptime_in_days": info.get("uptime_in_days", 0),
+                }
+            )
+    except CacheUnavailable as e:
+        stats["available"] = False
+        stats["error"] = str(e)
     return stats
 
 
-def list_cache_keys(pattern: str = "*") -> List[str]:
-    client = get_redis_client()
-    return client.keys(pattern)
+def _scan_count() -> int:
+    return current_app.config.get("CACHE_SCAN_COUNT", 1000)
 
 
-def get_key_info(key: str) -> Dict[str, str]:
-    client = get_redis_client()
-    ttl = client.ttl(key)
+# Like get_cache_stats, the helpers below degrade instead of failing when
+# Redis is down or the circuit breaker is open: listings come back empty,
+# counts as 0, and reports with "available" set to False and the error.
+def _warn_unavailable(action: str, error: CacheUnavailable) -> None:
+    current_app.logger.warning(f"Cache unavailable, cannot {action}: {str(error)}")
+
+
+def iter_cache_keys(pattern: str = "*") -> Iterator[str]:
+    """
+    Iterate over matching keys with SCAN, without blocking Redis like KEYS
+    """
+    client = get_cache_backend()
+    try:
+        with redis_guard():
+            yield from client.scan_iter(match=pattern, count=_scan_count())
+    except CacheUnavailable as e:
+        _warn_unavailable("list keys", e)
+
+
+def scan_cache_keys(
+    pattern: str = "*", cursor: int = 0, limit: int = 100
+) -> Tuple[List[str], int]:
+    """
+    Get one page of matching keys and the cursor to resume from (0 when done)
+
+    SCAN may return fewer keys than asked for per call, so calls continue
+    until the page has at least limit keys; it can exceed limit slightly.
+    """
+    client = get_cache_backend()
+    keys = []
+    try:
+        with redis_guard():
+            while True:
+                cursor, batch = client.scan(cursor=cursor, match=pattern, count=limit)
+                keys.extend(batch)
+                if cursor == 0 or len(keys) >= limit:
+                    return keys, cursor
+    except CacheUnavailable as e:
+        _warn_unavailable("list keys", e)
+        return [], 0
+
+
+def _scan_pages(client) -> Iterator[List[str]]:
+    cursor = 0
+    while True:
+        cursor, keys = client.scan(cursor=cursor, count=_scan_count())
+        if keys:
+            yield keys
+        if cursor == 0:
+            return
+
+
+def list_cache_keys(pattern: str = "*", limit: Optional[int] = None) -> List[str]:
+    return list(islice(iter_cache_keys(pattern), limit))
 
-    info = {
-        "key": key,
-        "ttl": (
-            str(ttl) + " seconds"
-            if ttl > 0
-            else "No expiration" if ttl == -1 else "Key does not exist"
-        ),
-        "type": (
-            client.type(key).decode("utf-8") if client.exists(key) else "Does not exist"
-        ),
-    }
 
-    # Add extra info based on type
-    if info["type"] == "string" and client.exists(key):
-        info["size"] = str(len(client.get(key) or "")) + " bytes"
+def count_cache_keys(pattern: str = "*") -> int:
+    if pattern == "*":
+        try:
+            with redis_guard():
+                return get_cache_backend().dbsize()
+        except CacheUnavailable as e:
+            _warn_unavailable("count keys", e)
+            return 0
+    return sum(1 for _ in iter_cache_keys(pattern))
+
+
+def get_key_info(key: str) -> Dict[str, Any]:
+    client = get_cache_backend()
+    try:
+        with redis_guard():
+            ttl = client.ttl(key)
+
+            info = {
+                "key": key,
+                "ttl": (
+                    str(ttl) + " seconds"
+                    if ttl > 0
+                    else "No expiration" if ttl == -1 else "Key does not exist"
+                ),
+                "type": client.type(key) if client.exists(key) else "Does not exist",
+            }
+
+            # Add extra info based on type
+            if info["type"] == "string":
+                # Values are binary (see the cache codec), so measure them in Redis
+                info["size"] = str(client.strlen(key)) + " bytes"
+    except CacheUnavailable as e:
+        return {"key": key, "available": False, "error": str(e)}
 
     return info
 
 
-def clear_cache(pattern: str = "*") -> int:
-    client = get_redis_client()
-    keys = client.keys(pattern)
-    if keys:
-        return client.delete(*keys)
-    return 0
+def clear_cache(pattern: str = "*", batch_size: int = 500) -> int:
+    return delete_pattern(pattern, batch_size)
+
+
+# Upper bounds (seconds) of the TTL buckets reported by get_cache_usage
+TTL_BUCKETS = [
+    ("< 1 min", 60),
+    ("1-5 min", 300),
+    ("5-15 min", 900),
+    ("15-60 min", 3600),
+    ("1-24 h", 86400),
+    ("> 24 h", None),
+]
+
+
+def _ttl_bucket(ttl: int) -> str:
+    if ttl < 0:
+        return "no expiry"
+    for label, upper in TTL_BUCKETS:
+        if upper is None or ttl < upper:
+            return label
+
 
+def _usage_prefix(key: str) -> str:
+    # Bookkeeping keys are reported as one group each
+    for internal in (NAMESPACE_VERSION_PREFIX, NAMESPACE_WRITES_PREFIX, METRICS_PREFIX):
+        if key.startswith(f"{internal}:"):
+            return internal
+    return metrics_prefix(key)
 
-def get_cache_usage_by_prefix() -> List[Dict[str, any]]:
-    client = get_redis_client()
-    all_keys = client.keys("*")
 
-    # Group keys by prefix
+def _sample_usage(
+    client: Any,
+    prefix_groups: Dict[str, Dict[str, Any]],
+    largest: List[Tuple[int, str, int]],
+    sample_size: int,
+    top: int,
+) -> None:
+    """
+    Count every key into prefix_groups and add the sampled ones to largest
+    """
+    for cursor_page in _scan_pages(client):
+        sampled = []
+        for key in cursor_page:
+            prefix = _usage_prefix(key)
+            group = prefix_groups.get(prefix)
+            if group is None:
+                group = prefix_groups[prefix] = {
+                    "prefix": prefix,
+                    "count": 0,
+                    "sampled": 0,
+                    "sampled_bytes": 0,
+                    "ttl_distribution": {},
+                    "examples": [],
+                }
+            group["count"] += 1
+            if len(group["examples"]) < 3:
+                group["examples"].append(key)
+            if group["sampled"] < sample_size:
+                group["sampled"] += 1
+                sampled.append((group, key))
+        if not sampled:
+            continue
+
+        pipe = client.pipeline(transaction=False)
+        for _, key in sampled:
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        results = pipe.execute()
+        for (group, key), size, ttl in zip(sampled, results[::2], results[1::2]):
+            if size is None:
+                # Expired between SCAN and MEMORY USAGE
+                group["sampled"] -= 1
+                continue
+            group["sampled_bytes"] += size
+            bucket = _ttl_bucket(ttl)
+            group["ttl_distribution"][bucket] = (
+                group["ttl_distribution"].get(bucket, 0) + 1
+            )
+            if len(largest) < top:
+                heapq.heappush(largest, (size, key, ttl))
+            elif size > largest[0][0]:
+                heapq.heapreplace(largest, (size, key, ttl))
+
+
+def get_cache_usage(sample_size: int = 50, top: int = 10) -> Dict[str, Any]:
+    """
+    Estimate memory use per key prefix from a sample of keys
+
+    Every key is counted while scanning, but MEMORY USAGE and TTL are only
+    fetched, pipelined per SCAN page, for the first sample_size keys of each
+    prefix. A prefix's bytes are its average sampled size times its count.
+    """
+    client = get_cache_backend()
     prefix_groups = {}
-    for key in all_keys:
-        # Extract prefix (everything before the first colon)
-        parts = key.split(":")
-        prefix = parts[0] if parts else key
+    largest = []  # min-heap of (bytes, key, ttl)
 
-        if prefix not in prefix_groups:
-            prefix_groups[prefix] = []
-        prefix_groups[prefix].append(key)
+    try:
+        with redis_guard():
+            _sample_usage(client, prefix_groups, largest, sample_size, top)
+    except CacheUnavailable as e:
+        return {
+            "available": False,
+            "error": str(e),
+            "usage_by_prefix": [],
+            "estimated_total_bytes": 0,
+            "largest_keys": [],
+        }
 
-    # Calculate stats for each prefix
     result = []
-    for prefix, keys in prefix_groups.items():
+    for group in prefix_groups.values():
+        sampled_bytes = group.pop("sampled_bytes")
+        average = sampled_bytes / group["sampled"] if group["sampled"] else 0
+        group["avg_bytes"] = round(average)
+        group["estimated_bytes"] = round(average * group["count"])
+        result.append(group)
+
+    # Sort by estimated size (descending)
+    result.sort(key=lambda x: x["estimated_bytes"], reverse=True)
+
+    return {
+        "usage_by_prefix": result,
+        "estimated_total_bytes": sum(x["estimated_bytes"] for x in result),
+        "largest_keys": [
+            {"key": key, "bytes": size, "ttl": ttl}
+            for size, key, ttl in sorted(largest, reverse=True)
+        ],
+    }
+
+
+def renew_cache_ttl(key: str, new_ttl: int) -> bool:
+    client = get_cache_backend()
+    try:
+        with redis_guard():
+            if client.exists(key):
+                return client.expire(key, new_ttl)
+    except CacheUnavailable as e:
+        _warn_unavailable("renew TTL", e)
+    return False
+
+
+def get_cache_metrics() -> List[Dict[str, Any]]:
+    """
+    Report hit ratio, latency and payload sizes per key prefix, aggregated
+    over every worker since the last reset
+    """
+    metrics = get_metrics_recorder()
+    if metrics is not None:
+        metrics.flush()
+
+    client = get_cache_backend()
+    try:
+        with redis_guard():
+            prefixes = sorted(client.smembers(METRICS_INDEX))
+            pipe = client.pipeline(transaction=False)
+            for prefix in prefixes:
+                pipe.hgetall(f"{METRICS_PREFIX}:{prefix}")
+            all_counters = pipe.execute()
+    except CacheUnavailable as e:
+        _warn_unavailable("read metrics", e)
+        return []
+
+    result = []
+    for prefix, counters in zip(prefixes, all_counters):
+        values = {name: float(value) for name, value in counters.items()}
+        hits = int(values.get("hits", 0))
+        misses = int(values.get("misses", 0))
+        redis_calls = int(values.get("redis_calls", 0))
         result.append(
             {
                 "prefix": prefix,
-                "count": len(keys),
-                "examples": keys[:3],  # First 3 examples
+                "hits": hits,
+                "misses": misses,
+                "l1_hits": int(values.get("l1_hits", 0)),
+                "stale_hits": int(values.get("stale_hits", 0)),
+                "invalidations": int(values.get("invalidations", 0)),
+                "hit_ratio": (
+                    round(hits / (hits + misses), 4) if hits + misses else None
+                ),
+                "redis_calls": redis_calls,
+                "avg_redis_ms": (
+                    round(values.get("redis_seconds", 0) / redis_calls * 1000, 3)
+                    if redis_calls
+                    else None
+                ),
+                "avg_compute_ms": (
+                    round(values.get("compute_seconds", 0) / misses * 1000, 3)
+                    if misses
+                    else None
+                ),
+                "avg_serialize_ms": (
+                    round(values.get("serialize_seconds", 0) / misses * 1000, 3)
+                    if misses
+                    else None
+                ),
+                "bytes_read": int(values.get("bytes_read", 0)),
+                "bytes_written": int(values.get("bytes_written", 0)),
             }
         )
 
-    # Sort by count (descending)
-    result.sort(key=lambda x: x["count"], reverse=True)
+    # Busiest prefixes first
+    result.sort(key=lambda x: x["hits"] + x["misses"], reverse=True)
 
     return result
 
 
-def renew_cache_ttl(key: str, new_ttl: int) -> bool:
-    client = get_redis_client()
-    if client.exists(key):
-        return client.expire(key, new_ttl)
-    return False
+def reset_cache_metrics() -> int:
+    metrics = get_metrics_recorder()
+    if metrics is not None:
+        metrics.flush()
+
+    client = get_cache_backend()
+    try:
+        with redis_guard():
+            prefixes = client.smembers(METRICS_INDEX)
+            keys = [f"{METRICS_PREFIX}:{prefix}" for prefix in prefixes]
+            return client.unlink(METRICS_INDEX, *keys) if prefixes else 0
+    except CacheUnavailable as e:
+        _warn_unavailable("reset metrics", e)
+        return 0
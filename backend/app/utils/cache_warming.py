@@ -0,0 +1,134 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from ..database import db
+from ..models import Role, ServiceRequest, User
+
+# Endpoints warmed once, with any admin's token (their entries are shared)
+CATALOG_PATHS = ["/service/"]
+ADMIN_PATHS = [
+    "/admin/roles",
+    "/admin/services",
+    "/admin/dashboard/stats",
+    "/admin/requests",
+]
+
+# Endpoints warmed for each recently active user, whose entries are per user
+CUSTOMER_PATHS = [
+    "/customer/dashboard/stats",
+    "/customer/dashboard/activity",
+    "/customer/requests",
+]
+PROFESSIONAL_PATHS = [
+    "/professional/dashboard/stats",
+    "/professional/dashboard/activity",
+    "/professional/requests",
+    "/professional/requests/assigned",
+]
+
+
+def _auth_headers(user: User) -> Dict[str, str]:
+    # The same claims as a login, so role checks pass and {identity} resolves
+    token = create_access_token(
+        identity=str(user.id),
+        additional_claims={"roles": [role.name for role in user.roles]},
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _recently_active(column: Any, limit: int, *criteria: Any) -> List[User]:
+    """
+    Get the users with the latest service requests through column, newest first
+    """
+    if limit <= 0:
+        return []
+    return (
+        User.query.join(ServiceRequest, column == User.id)
+        .filter(*criteria)
+        .group_by(User.id)
+        .order_by(func.max(ServiceRequest.date_of_request).desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def warm_targets(users: int) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    List the (path, headers) requests that warm the cache: the catalog, the
+    admin pages and the pages of the users most recently active
+    """
+    targets = [(path, {}) for path in CATALOG_PATHS]
+
+    admin = (
+        User.query.join(User.roles)
+        .filter(Role.name == "admin", User.blocked.isnot(True))
+        .order_by(User.id)
+        .first()
+    )
+    if admin is not None:
+        headers = _auth_headers(admin)
+        targets.extend((path, headers) for path in ADMIN_PATHS)
+
+    for customer in _recently_active(
+        ServiceRequest.customer_id, users, User.blocked.isnot(True)
+    ):
+        headers = _auth_headers(customer)
+        targets.extend((path, headers) for path in CUSTOMER_PATHS)
+
+    for professional in _recently_active(
+        ServiceRequest.professional_id,
+        users,
+        User.blocked.isnot(True),
+        User.status == "approved",
+    ):
+        headers = _auth_headers(professional)
+        targets.extend((path, headers) for path in PROFESSIONAL_PATHS)
+
+    return targets
+
+
+def warm_cache(
+    users: Optional[int] = None, concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Precompute cached endpoints by requesting them, so that the first users
+    after a deploy or a purge do not pay for every cold query at once
+
+    Requests go through the app itself, so they fill exactly the keys (and
+    namespaces) real requests use. At most concurrency of them run at a time,
+    each holding one database connection.
+    """
+    config = current_app.config
+    if users is None:
+        users = config.get("CACHE_WARM_USERS", 50)
+    if concurrency is None:
+        concurrency = config.get("CACHE_WARM_CONCURRENCY", 4)
+
+    targets = warm_targets(users)
+    # Give this thread's connection back while the workers hold theirs
+    db.session.remove()
+
+    app = current_app._get_current_object()
+
+    def fetch(target: Tuple[str, Dict[str, str]]) -> Tuple[str, int]:
+        path, headers = target
+        # Each request pushes its own app context, and so its own session
+        return path, app.test_client().get(path, headers=headers).status_code
+
+    started = time.monotonic()
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for path, status in pool.map(fetch, targets):
+            if status != 200:
+                failed.append(path)
+                app.logger.warning(f"Cache warming got {status} for {path}")
+
+    return {
+        "requests": len(targets),
+        "warmed": len(targets) - len(failed),
+        "failed": len(failed),
+        "seconds": round(time.monotonic() - started, 3),
+    }
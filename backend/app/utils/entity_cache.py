@@ -0,0 +1,327 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, selectinload
+from ..database import db
+from ..models import Service, ServiceRequest, User
+from .pagination import keyset_page
+from .cache import (
+    NAMESPACE_VERSION_PREFIX,
+    CacheUnavailable,
+    CodecError,
+    apply_deferred_invalidations,
+    decode_value,
+    defer_invalidation,
+    encode_value,
+    get_cache_backend,
+    record_cache_metrics,
+    redis_guard,
+)
+
+# Rows are cached one record per entity (ent:sr:{id}, ent:user:{id},
+# ent:service:{id}), so changing a row touches a single entry. List endpoints
+# cache only the IDs they contain, in order (see service_request_refs), and
+# assemble their rows with one MGET (see compose_service_requests); a status
+# change no longer flushes any list.
+#
+# Every entity also has a generation counter, bumped like a namespace's when
+# a session commits a change to its row ("cache:version:ent:sr:{id}"). A
+# record is stored with the generation read before its row was loaded and is
+# only served while that is still current, so a reader that loaded the row
+# just before a commit can store it late without it ever being served.
+ENTITY_PREFIXES = {
+    ServiceRequest: "ent:sr",
+    User: "ent:user",
+    Service: "ent:service",
+}
+
+# Columns never copied into a record
+ENTITY_EXCLUDE = {User: ("password",)}
+
+# Collections copied into a record, with the columns kept for each item
+ENTITY_COLLECTIONS = {User: {"roles": ("id", "name")}}
+
+# What a service request record is assembled with, by attribute:
+# (related model, foreign key column)
+SERVICE_REQUEST_RELATIONS = {
+    "customer": (User, "customer_id"),
+    "professional": (User, "professional_id"),
+    "service": (Service, "service_id"),
+}
+
+# Columns kept in list ID caches, so a list can fetch its requests and
+# everything they embed in the same MGET
+SERVICE_REQUEST_REFS = ("id", "customer_id", "professional_id", "service_id")
+
+# IDs the database has no row for are stored too, with no record, so that
+# looking them up again (e.g. a client polling a deleted request) does not
+# query it every time. Creating the row bumps its generation like any change.
+
+
+class EntityRecord(dict):
+    """
+    A cached row whose fields read as keys or, like the model's, as attributes
+    """
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _as_record(value: Any) -> Any:
+    if isinstance(value, dict):
+        return EntityRecord((k, _as_record(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_as_record(item) for item in value]
+    return value
+
+
+def entity_key(model: type, entity_id: Any) -> str:
+    return f"{ENTITY_PREFIXES[model]}:{entity_id}"
+
+
+def entity_version_key(model: type, entity_id: Any) -> str:
+    return f"{NAMESPACE_VERSION_PREFIX}:{entity_key(model, entity_id)}"
+
+
+def _decode_entry(blob: Optional[bytes], version: int) -> Tuple[bool, Any]:
+    """
+    Get (cached, record) from an entry: cached is False unless it was stored
+    in the entity's current generation, and record is None for missing rows
+    """
+    if blob is None:
+        return False, None
+    try:
+        entry = decode_value(blob)
+    except CodecError:
+        return False, None
+    if not isinstance(entry, list) or len(entry) != 2 or entry[0] != version:
+        return False, None
+    return True, entry[1]
+
+
+def entity_record(obj: Any) -> Dict[str, Any]:
+    """
+    Copy the columns (and listed collections) of a row into a plain dict
+    """
+    model = type(obj)
+    exclude = ENTITY_EXCLUDE.get(model, ())
+    record = {
+        column.key: getattr(obj, column.key)
+        for column in inspect(model).column_attrs
+        if column.key not in exclude
+    }
+    for name, columns in ENTITY_COLLECTIONS.get(model, {}).items():
+        record[name] = [
+            {column: getattr(item, column) for column in columns}
+            for item in getattr(obj, name)
+        ]
+    return record
+
+
+def load_entities(
+    wanted: Dict[type, Iterable[Any]],
+) -> Dict[type, Dict[Any, EntityRecord]]:
+    """
+    Get the records of several entities, of any models, with one MGET
+
+    The same MGET reads each entity's generation. Records missing from the
+    cache, or stored in an older generation, are read from the database, one
+    query per model, and stored with the generation read before the query.
+    Rows that do not exist are left out of the result, and remembered as
+    such for CACHE_NOT_FOUND_TTL seconds.
+    """
+    entities = [
+        (model, entity_id)
+        for model, ids in wanted.items()
+        for entity_id in dict.fromkeys(ids)
+        if entity_id is not None
+    ]
+    found = {model: {} for model in wanted}
+    if not entities:
+        return found
+
+    backend = None
+    blobs = [None] * len(entities)
+    versions = [None] * len(entities)
+    try:
+        # Generations this worker could not bump during an outage go first,
+        # or records changed meanwhile would be served until they expire
+        apply_deferred_invalidations()
+        with redis_guard():
+            backend = get_cache_backend(decode_responses=False)
+            values = backend.mget(
+                [entity_key(*entity) for entity in entities]
+                + [entity_version_key(*entity) for entity in entities]
+            )
+            blobs, versions = values[: len(entities)], values[len(entities) :]
+    except CacheUnavailable:
+        # Serve everything from the database and leave the cache alone
+        backend = None
+
+    missing = {}
+    generations = {}
+    for (model, entity_id), blob, version in zip(entities, blobs, versions):
+        generations[model, entity_id] = int(version or 0)
+        cached, record = _decode_entry(blob, generations[model, entity_id])
+        if not cached:
+            missing.setdefault(model, []).append(entity_id)
+        elif record is not None:
+            found[model][entity_id] = _as_record(record)
+    for model in wanted:
+        misses = len(missing.get(model, ()))
+        record_cache_metrics(
+            entity_key(model, "*"),
+            hits=len(found[model]),
+            misses=misses,
+        )
+    if not missing:
+        return found
+
+    fills = {}
+    not_found_ttl = current_app.config.get("CACHE_NOT_FOUND_TTL", 60)
+    for model, ids in missing.items():
+        query = model.query.filter(model.id.in_(ids))
+        collections = ENTITY_COLLECTIONS.get(model, {})
+        if collections:
+            query = query.options(
+                *(selectinload(getattr(model, name)) for name in collections)
+            )
+        for obj in query:
+            record = entity_record(obj)
+            found[model][obj.id] = _as_record(record)
+            fills[model, obj.id] = record
+        if not_found_ttl > 0:
+            for entity_id in ids:
+                if entity_id not in found[model]:
+                    fills[model, entity_id] = None
+
+    if fills and backend is not None:
+        ttl = current_app.config.get("CACHE_ENTITY_TTL", 3600)
+        try:
+            with redis_guard():
+                pipe = backend.pipeline(transaction=False)
+                for entity, record in fills.items():
+                    # A plain SET: an entry of an older generation is never
+                    # served, so it may be replaced, and whichever reader
+                    # stores last, a commit since its MGET makes it a miss
+                    pipe.set(
+                        entity_key(*entity),
+                        encode_value([generations[entity], record]),
+                        ex=not_found_ttl if record is None else ttl,
+                    )
+                pipe.execute()
+        except CacheUnavailable:
+            pass
+    return found
+
+
+def service_request_refs(*criteria: Any) -> List[List[Any]]:
+    """
+    Get the SERVICE_REQUEST_REFS of the requests matching some filters, by ID
+
+    This is what list endpoints cache; see compose_service_requests.
+    """
+    columns = [getattr(ServiceRequest, column) for column in SERVICE_REQUEST_REFS]
+    rows = (
+        db.session.query(*columns).filter(*criteria).order_by(ServiceRequest.id).all()
+    )
+    return [list(row) for row in rows]
+
+
+def service_request_page(
+    criteria: Sequence[Any], cursor: Optional[str], limit: Optional[int]
+) -> List[Any]:
+    """
+    Get [refs, next_cursor] for one page of the requests matching some
+    filters, newest first by date_of_request, or for all of them by ID when
+    limit is None (next_cursor is then None)
+    """
+    if limit is None:
+        return [service_request_refs(*criteria), None]
+    columns = [getattr(ServiceRequest, column) for column in SERVICE_REQUEST_REFS]
+    query = db.session.query(*columns, ServiceRequest.date_of_request).filter(*criteria)
+    rows, next_cursor = keyset_page(
+        query, ServiceRequest.date_of_request, ServiceRequest.id, cursor, limit
+    )
+    return [[list(row[: len(columns)]) for row in rows], next_cursor]
+
+
+def _attach_relations(
+    records: List[EntityRecord],
+    entities: Optional[Dict[type, Dict[Any, EntityRecord]]] = None,
+) -> None:
+    """
+    Set the customer, professional and service of request records, loading
+    whichever are not in entities yet
+    """
+    entities = entities if entities is not None else {}
+    wanted = {}
+    for record in records:
+        for model, column in SERVICE_REQUEST_RELATIONS.values():
+            related_id = record.get(column)
+            if related_id is not None and related_id not in entities.get(model, {}):
+                wanted.setdefault(model, []).append(related_id)
+    if wanted:
+        for model, loaded in load_entities(wanted).items():
+            entities.setdefault(model, {}).update(loaded)
+
+    for record in records:
+        for name, (model, column) in SERVICE_REQUEST_RELATIONS.items():
+            record[name] = entities.get(model, {}).get(record.get(column))
+
+
+def compose_service_requests(refs: Sequence[Sequence[Any]]) -> List[EntityRecord]:
+    """
+    Assemble service requests, with their customer, professional and
+    service, from the entity cache
+
+    Takes rows of SERVICE_REQUEST_REFS as returned by service_request_refs,
+    and fetches every record they name in a single MGET.
+    """
+    refs = [dict(zip(SERVICE_REQUEST_REFS, ref)) for ref in refs]
+    wanted = {ServiceRequest: [ref["id"] for ref in refs]}
+    for model, column in SERVICE_REQUEST_RELATIONS.values():
+        wanted.setdefault(model, []).extend(ref[column] for ref in refs)
+    entities = load_entities(wanted)
+
+    # Requests deleted since the list was cached are simply skipped
+    records = [
+        entities[ServiceRequest][ref["id"]]
+        for ref in refs
+        if ref["id"] in entities[ServiceRequest]
+    ]
+    _attach_relations(records, entities)
+    return records
+
+
+def get_service_request(request_id: int) -> Optional[EntityRecord]:
+    """
+    Get one service request, with its customer, professional and service,
+    from the entity cache, or None if it does not exist
+    """
+    record = load_entities({ServiceRequest: [request_id]})[ServiceRequest].get(
+        request_id
+    )
+    if record is not None:
+        _attach_relations([record])
+    return record
+
+
+@event.listens_for(Session, "after_flush")
+def _record_entity_changes(session, flush_context) -> None:
+    """
+    Bump the generations of the flushed rows once the transaction commits
+    (see defer_invalidation)
+    """
+    for obj in session.new:
+        if type(obj) in ENTITY_PREFIXES:
+            defer_invalidation(session, entity_key(type(obj), obj.id))
+    for obj in session.dirty:
+        if type(obj) in ENTITY_PREFIXES and session.is_modified(obj):
+            defer_invalidation(session, entity_key(type(obj), obj.id))
+    for obj in session.deleted:
+        if type(obj) in ENTITY_PREFIXES:
+            defer_invalidation(session, entity_key(type(obj), obj.id))
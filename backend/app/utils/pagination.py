@@ -0,0 +1,114 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from flask import abort, request
+from flask_restx import marshal
+from sqlalchemy import and_, or_, tuple_
+
+# Lists are paged by keyset: newest first on (sort column, id), each page
+# starting strictly after the last row of the previous one, so a page costs
+# the same however deep it is, and rows added meanwhile never shift it.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# For @ns.doc(params=PAGE_PARAMS) on paged list endpoints
+PAGE_PARAMS = {
+    "limit": f"Page size (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE}); "
+    "with limit or cursor the response is {items, next_cursor}",
+    "cursor": "next_cursor of the previous page",
+}
+
+
+def encode_cursor(sort_value: Optional[datetime], row_id: int) -> str:
+    value = sort_value.isoformat() if sort_value is not None else None
+    data = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """
+    Get the (sort value, id) a cursor points after; raises ValueError if the
+    cursor was not made by encode_cursor
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(data)
+        if not isinstance(row_id, int):
+            raise ValueError("Cursor id is not an integer")
+        return (datetime.fromisoformat(value) if value is not None else None), row_id
+    except (TypeError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(str(e)) from None
+
+
+def page_args() -> Tuple[Optional[str], Optional[int]]:
+    """
+    Get the cursor and limit of the current request
+
+    The limit is None when the request has neither parameter, for clients
+    that still expect the whole list; an invalid cursor, or a limit that is
+    not a positive integer, aborts with 400.
+    """
+    cursor = request.args.get("cursor") or None
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            abort(400, "Limit must be a positive integer")
+    if cursor is None and limit is None:
+        return None, None
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            abort(400, "Invalid cursor")
+    limit = DEFAULT_PAGE_SIZE if limit is None else limit
+    return cursor, min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(
+    query: Any, sort_column: Any, id_column: Any, cursor: Optional[str], limit: int
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Get one page of a query, newest first, and the cursor of the next page
+    (None on the last one)
+
+    Rows without a sort value come last. Rows must expose both columns as
+    attributes, as entities and column queries do.
+    """
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.filter(and_(sort_column.is_(None), id_column < row_id))
+        else:
+            query = query.filter(
+                or_(
+                    tuple_(sort_column, id_column) < tuple_(sort_value, row_id),
+                    sort_column.is_(None),
+                )
+            )
+    rows = (
+        query.order_by(sort_column.desc().nulls_last(), id_column.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(
+        getattr(last, sort_column.key), getattr(last, id_column.key)
+    )
+
+
+def page_response(
+    items: List[Any], model: Any, limit: Optional[int], next_cursor: Optional[str]
+) -> Any:
+    """
+    Marshal a whole list, or a page of it with the cursor of the next one
+    """
+    if limit is None:
+        return marshal(items, model)
+    return {"items": marshal(items, model), "next_cursor": next_cursor}
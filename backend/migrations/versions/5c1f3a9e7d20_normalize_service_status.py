@@ -0,0 +1,119 @@
+"""normalize service status
+
+Revision ID: 5c1f3a9e7d20
+Revises: cffb96e799ce
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1f3a9e7d20'
+down_revision = 'cffb96e799ce'
+branch_labels = None
+depends_on = None
+
+
+# Canonical spellings, as in app.models.ServiceStatus at this revision
+STATUSES = ['Pending', 'Accepted', 'Completed', 'Cancelled']
+
+UNASSIGNED_INDEX = 'ix_service_request_unassigned'
+# Where the replacement is built, so that the old index keeps serving reads
+# until the new one is ready
+UNASSIGNED_INDEX_TMP = 'ix_service_request_unassigned_tmp'
+
+
+def _recreate_unassigned_index(where):
+    kwargs = {'postgresql_where': sa.text(where), 'sqlite_where': sa.text(where)}
+    if op.get_bind().dialect.name != 'postgresql':
+        # DDL is transactional elsewhere (SQLite cannot rename an index)
+        op.drop_index(UNASSIGNED_INDEX, table_name='service_request', if_exists=True)
+        op.create_index(
+            UNASSIGNED_INDEX, 'service_request', ['date_of_request', 'id'], **kwargs
+        )
+        return
+
+    with op.get_context().autocommit_block():
+        # A build interrupted by an earlier run leaves an invalid index behind
+        op.drop_index(
+            UNASSIGNED_INDEX_TMP,
+            table_name='service_request',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            UNASSIGNED_INDEX_TMP,
+            'service_request',
+            ['date_of_request', 'id'],
+            postgresql_concurrently=True,
+            **kwargs
+        )
+        op.drop_index(
+            UNASSIGNED_INDEX,
+            table_name='service_request',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.execute(
+            f'ALTER INDEX {UNASSIGNED_INDEX_TMP} RENAME TO {UNASSIGNED_INDEX}'
+        )
+
+
+def upgrade():
+    service_request = sa.table('service_request', sa.column('service_status'))
+    status = sa.func.lower(sa.func.trim(service_request.c.service_status))
+    for canonical in STATUSES:
+        op.execute(
+            service_request.update()
+            .where(status == canonical.lower())
+            .values(service_status=canonical)
+        )
+    # Rows created without a status got the old "pending" default
+    op.execute(
+        service_request.update()
+        .where(service_request.c.service_status.is_(None))
+        .values(service_status='Pending')
+    )
+
+    unknown = op.get_bind().execute(
+        sa.select(service_request.c.service_status)
+        .where(service_request.c.service_status.notin_(STATUSES))
+        .distinct()
+    ).scalars().all()
+    if unknown:
+        raise RuntimeError(
+            f"service_request.service_status has values that are not one of "
+            f"{', '.join(STATUSES)}: {', '.join(map(repr, unknown))}; "
+            f"fix them before upgrading"
+        )
+
+    with op.batch_alter_table('service_request', schema=None) as batch_op:
+        batch_op.alter_column(
+            'service_status',
+            existing_type=sa.String(length=20),
+            nullable=False,
+            server_default='Pending',
+        )
+        batch_op.create_check_constraint(
+            'service_status',
+            sa.column('service_status').in_(STATUSES),
+        )
+
+    _recreate_unassigned_index(
+        "professional_id IS NULL AND service_status = 'Pending'"
+    )
+
+
+def downgrade():
+    _recreate_unassigned_index('professional_id IS NULL')
+
+    with op.batch_alter_table('service_request', schema=None) as batch_op:
+        batch_op.drop_constraint('service_status', type_='check')
+        batch_op.alter_column(
+            'service_status',
+            existing_type=sa.String(length=20),
+            nullable=True,
+            server_default=None,
+        )
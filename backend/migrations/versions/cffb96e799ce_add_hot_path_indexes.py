@@ -0,0 +1,120 @@
+"""add hot path indexes
+
+Revision ID: cffb96e799ce
+Revises: e37fd20f5743
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cffb96e799ce'
+down_revision = 'e37fd20f5743'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_user_date_created_id', 'user', ['date_created', 'id'], None),
+    ('ix_user_status', 'user', ['status'], None),
+    ('ix_service_request_date_id', 'service_request', ['date_of_request', 'id'], None),
+    (
+        'ix_service_request_customer_date_id',
+        'service_request',
+        ['customer_id', 'date_of_request', 'id'],
+        None,
+    ),
+    (
+        'ix_service_request_professional_date_id',
+        'service_request',
+        ['professional_id', 'date_of_request', 'id'],
+        None,
+    ),
+    (
+        'ix_service_request_professional_status',
+        'service_request',
+        ['professional_id', 'service_status'],
+        None,
+    ),
+    (
+        'ix_service_request_status_completion',
+        'service_request',
+        ['service_status', 'date_of_completion'],
+        None,
+    ),
+    ('ix_service_request_service_id', 'service_request', ['service_id'], None),
+    (
+        'ix_service_request_unassigned',
+        'service_request',
+        ['date_of_request', 'id'],
+        'professional_id IS NULL',
+    ),
+    ('ix_document_user_id', 'document', ['user_id'], None),
+]
+
+
+def _concurrently():
+    # CREATE INDEX CONCURRENTLY does not lock out writes, but cannot run
+    # inside a transaction
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _invalid_indexes():
+    # A CREATE INDEX CONCURRENTLY that failed (e.g. an interrupted earlier run
+    # of this migration) leaves an INVALID index that IF NOT EXISTS would keep.
+    # Offline (--sql) there is no database to ask.
+    if op.get_context().as_sql:
+        return set()
+    rows = op.get_bind().execute(
+        sa.text(
+            'SELECT c.relname FROM pg_index i '
+            'JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE NOT i.indisvalid AND c.relname = ANY(:names)'
+        ),
+        {'names': [name for name, _, _, _ in INDEXES]},
+    )
+    return {name for name, in rows}
+
+
+def upgrade():
+    concurrently = _concurrently()
+    invalid = _invalid_indexes() if concurrently else set()
+    for name, table, columns, where in INDEXES:
+        kwargs = {}
+        if where is not None:
+            kwargs['postgresql_where'] = sa.text(where)
+            kwargs['sqlite_where'] = sa.text(where)
+        if concurrently:
+            with op.get_context().autocommit_block():
+                if name in invalid:
+                    op.drop_index(
+                        name,
+                        table_name=table,
+                        postgresql_concurrently=True,
+                        if_exists=True,
+                    )
+                op.create_index(
+                    name,
+                    table,
+                    columns,
+                    postgresql_concurrently=True,
+                    if_not_exists=True,
+                    **kwargs
+                )
+        else:
+            op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def downgrade():
+    concurrently = _concurrently()
+    for name, table, columns, where in reversed(INDEXES):
+        if concurrently:
+            with op.get_context().autocommit_block():
+                op.drop_index(
+                    name, table_name=table, postgresql_concurrently=True, if_exists=True
+                )
+        else:
+            op.drop_index(name, table_name=table, if_exists=True)
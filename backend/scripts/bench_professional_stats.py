@@ -0,0 +1,142 @@
+"""
+Time cold requests to /professional/dashboard/stats
+
+Seeds a throwaway SQLite database with one professional and their jobs,
+then requests the stats with the cache emptied before every request, and
+reports the median time and the SQL statements each request ran. The
+cache is kept in process, so no Redis is needed.
+
+    python scripts/bench_professional_stats.py [--completed 10000] ...
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert
+from werkzeug.security import generate_password_hash
+from app import create_app
+from app.config import Config
+from app.database import db
+from app.models import Role, Service, ServiceRequest, ServiceStatus, User
+from app.utils.cache import delete_pattern, get_local_cache
+
+
+def seed(completed: int, pending: int, accepted: int) -> int:
+    """
+    Create a customer, an approved professional and their jobs, and return
+    the professional's ID
+    """
+    users = {}
+    for role in ("customer", "professional"):
+        user = User(
+            username=role,
+            password=generate_password_hash(role),
+            email=f"{role}@example.com",
+            name=role.title(),
+            status="approved",
+        )
+        user.roles.append(Role.query.filter_by(name=role).one())
+        db.session.add(user)
+        users[role] = user
+    service = Service(name="Plumbing", price=100.0)
+    db.session.add(service)
+    db.session.commit()
+
+    statuses = (
+        [ServiceStatus.COMPLETED] * completed
+        + [ServiceStatus.PENDING] * pending
+        + [ServiceStatus.ACCEPTED] * accepted
+    )
+    db.session.execute(
+        insert(ServiceRequest.__table__),
+        [
+            {
+                "service_id": service.id,
+                "customer_id": users["customer"].id,
+                "professional_id": users["professional"].id,
+                "service_status": status,
+                "date_of_request": datetime.utcnow(),
+            }
+            for status in statuses
+        ],
+    )
+    db.session.commit()
+    return users["professional"].id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--completed", type=int, default=10000)
+    parser.add_argument("--pending", type=int, default=500)
+    parser.add_argument("--accepted", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument(
+        "--warmup", type=int, default=5, help="requests run before timing"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{directory}/bench.db"
+            CACHE_BACKEND = "memory"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            professional_id = seed(args.completed, args.pending, args.accepted)
+            token = create_access_token(
+                identity=str(professional_id),
+                additional_claims={"roles": ["professional"]},
+            )
+            headers = {"Authorization": f"Bearer {token}"}
+
+            statements = []
+            event.listen(
+                db.engine,
+                "before_cursor_execute",
+                lambda conn, cursor, statement, *rest: statements.append(statement),
+            )
+
+            client = app.test_client()
+            timings = []
+            for run in range(args.warmup + args.runs):
+                delete_pattern("*")
+                local_cache = get_local_cache()
+                if local_cache is not None:
+                    local_cache.clear()
+                statements.clear()
+                start = time.perf_counter()
+                response = client.get("/professional/dashboard/stats", headers=headers)
+                elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code != 200:
+                    sys.exit(
+                        f"Request failed ({response.status_code}): {response.data}"
+                    )
+                if run >= args.warmup:
+                    timings.append(elapsed)
+
+            db.session.remove()
+            db.engine.dispose()
+
+    print(
+        f"{args.completed} completed, {args.pending} pending, {args.accepted} "
+        f"accepted jobs; {args.runs} cold requests"
+    )
+    print(f"response:   {response.get_json()}")
+    print(
+        f"time:       median {statistics.median(timings):.1f} ms, "
+        f"min {min(timings):.1f} ms, max {max(timings):.1f} ms"
+    )
+    print(f"statements: {len(statements)} per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.config import Config
+from app.utils import cache
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    # Keep the cache in process so that tests never reach a real Redis
+    CACHE_BACKEND = "memory"
+
+
+def _reset_cache_state():
+    pid = os.getpid()
+    for state in (
+        cache._circuit_breakers,
+        cache._memory_stores,
+        cache._local_caches,
+        cache._deferred_invalidations,
+        cache._deferred_deletes,
+    ):
+        state.pop(pid, None)
+
+
+@pytest.fixture
+def app():
+    _reset_cache_state()
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+    _reset_cache_state()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(app):
+    token = create_access_token(identity="1", additional_claims={"roles": ["admin"]})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,44 @@
+import pytest
+from app.database import db
+from app.models import Service, ServiceRequest, ServiceStatus, User
+
+
+@pytest.fixture
+def request_id(app):
+    db.create_all()
+    customer = User(username="customer", password="x", name="Customer")
+    service = Service(name="Plumbing", price=100.0)
+    db.session.add_all([customer, service])
+    db.session.flush()
+    row = ServiceRequest(service_id=service.id, customer_id=customer.id)
+    db.session.add(row)
+    db.session.commit()
+    yield row.id
+    db.session.remove()
+    db.drop_all()
+
+
+@pytest.mark.parametrize(
+    "body", ["null", "[]", '"Cancelled"', '{"status": 5}', '{"status": "?"}']
+)
+def test_status_update_rejects_invalid_bodies(client, admin_headers, request_id, body):
+    response = client.patch(
+        f"/admin/requests/{request_id}/status",
+        data=body,
+        content_type="application/json",
+        headers=admin_headers,
+    )
+    assert response.status_code == 400
+    assert db.session.get(ServiceRequest, request_id).service_status == (
+        ServiceStatus.PENDING
+    )
+
+
+def test_status_update_normalizes_the_status(client, admin_headers, request_id):
+    response = client.patch(
+        f"/admin/requests/{request_id}/status",
+        json={"status": "cancelled"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert response.get_json()["service_status"] == ServiceStatus.CANCELLED
@@ -0,0 +1,56 @@
+import pytest
+from app.database import db
+from app.models import Service, ServiceRequest, User
+from app.utils.cache import SESSION_INVALIDATIONS
+
+
+@pytest.fixture
+def request_row(app):
+    db.create_all()
+    customer = User(username="customer", password="x", name="Customer")
+    professional = User(username="professional", password="x", name="Pro")
+    service = Service(name="Plumbing", price=100.0)
+    db.session.add_all([customer, professional, service])
+    db.session.flush()
+    row = ServiceRequest(
+        service_id=service.id,
+        customer_id=customer.id,
+        professional_id=professional.id,
+    )
+    db.session.add(row)
+    db.session.commit()
+    yield row
+    db.session.remove()
+    db.drop_all()
+
+
+def _invalidated_by_flush():
+    db.session.flush()
+    return set(db.session.info.pop(SESSION_INVALIDATIONS, {}))
+
+
+def test_renaming_a_customer_refreshes_their_professionals_feeds(request_row):
+    request_row.customer.name = "Renamed"
+    namespaces = _invalidated_by_flush()
+
+    assert (
+        f"professional:dashboard:activity:{request_row.professional_id}" in namespaces
+    )
+    # Lists only cache request IDs and pick up the new name from the entity
+    assert (
+        not {
+            "admin:requests",
+            f"customer:requests:{request_row.customer_id}",
+            "professional:requests:available",
+            f"professional:requests:assigned:{request_row.professional_id}",
+        }
+        & namespaces
+    )
+
+
+def test_renaming_a_professional_refreshes_their_customers_feeds(request_row):
+    request_row.professional.name = "Renamed"
+    namespaces = _invalidated_by_flush()
+
+    assert f"customer:activity:{request_row.customer_id}" in namespaces
+    assert f"customer:requests:{request_row.customer_id}" not in namespaces
@@ -0,0 +1,33 @@
+import pytest
+from app.utils.cache import cache_result
+
+
+class Unserializable:
+    pass
+
+
+def test_unserializable_results_are_returned_uncached(app):
+    calls = []
+
+    @cache_result("tests:unserializable", expiration=60)
+    def compute():
+        calls.append(1)
+        return Unserializable()
+
+    assert isinstance(compute(), Unserializable)
+    assert isinstance(compute(), Unserializable)
+    assert len(calls) == 2
+
+
+def test_errors_other_than_serialization_propagate(app, monkeypatch):
+    def broken(value):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr("app.utils.cache.serialize_value", broken)
+
+    @cache_result("tests:broken", expiration=60)
+    def compute():
+        return {"value": 1}
+
+    with pytest.raises(RuntimeError):
+        compute()
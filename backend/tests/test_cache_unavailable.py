@@ -0,0 +1,96 @@
+import redis
+import pytest
+from app.utils import cache, cache_management
+
+
+class UnreachableBackend:
+    """
+    Backend whose every command fails the way redis-py does when the server
+    is down
+    """
+
+    shared = True
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            raise redis.ConnectionError("Error 111 connecting to redis. Refused.")
+
+        return command
+
+
+@pytest.fixture
+def breaker_open(app):
+    breaker = cache.get_circuit_breaker()
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(redis.ConnectionError("Connection refused"))
+    assert breaker.state == cache.CircuitBreaker.OPEN
+    return breaker
+
+
+@pytest.fixture
+def redis_down(app, monkeypatch):
+    def get_backend(decode_responses=True):
+        return UnreachableBackend()
+
+    monkeypatch.setattr(cache, "get_cache_backend", get_backend)
+    monkeypatch.setattr(cache_management, "get_cache_backend", get_backend)
+
+
+# Every admin cache endpoint but warming, which only queues a task
+CACHE_ENDPOINTS = [
+    ("get", "/admin/cache/stats"),
+    ("get", "/admin/cache/metrics"),
+    ("delete", "/admin/cache/metrics"),
+    ("get", "/admin/cache/keys?pattern=service:*"),
+    ("get", "/admin/cache/key/service:1"),
+    ("delete", "/admin/cache/key/service:1"),
+    ("delete", "/admin/cache/clear?pattern=service:*"),
+    ("get", "/admin/cache/usage"),
+]
+
+
+def _call_all(client, headers):
+    return {
+        (method, path): getattr(client, method)(path, headers=headers)
+        for method, path in CACHE_ENDPOINTS
+    }
+
+
+def _assert_degraded(responses):
+    for (method, path), response in responses.items():
+        assert response.status_code == 200, (method, path, response.get_json())
+
+    assert responses["get", "/admin/cache/stats"].get_json()["available"] is False
+    assert responses["get", "/admin/cache/metrics"].get_json() == {"metrics": []}
+    assert responses["delete", "/admin/cache/metrics"].get_json() == {
+        "deleted_count": 0
+    }
+    assert responses["get", "/admin/cache/keys?pattern=service:*"].get_json() == {
+        "keys": [],
+        "cursor": 0,
+    }
+    assert (
+        responses["get", "/admin/cache/key/service:1"].get_json()["available"] is False
+    )
+    assert responses["delete", "/admin/cache/key/service:1"].get_json() == {
+        "success": False
+    }
+    assert responses["delete", "/admin/cache/clear?pattern=service:*"].get_json() == {
+        "deleted_count": 0
+    }
+    assert responses["get", "/admin/cache/usage"].get_json()["available"] is False
+
+
+def test_cache_endpoints_bypass_open_breaker(client, admin_headers, breaker_open):
+    _assert_degraded(_call_all(client, admin_headers))
+
+
+def test_cache_endpoints_survive_connection_errors(client, admin_headers, redis_down):
+    _assert_degraded(_call_all(client, admin_headers))
+    # The failures count towards the breaker like any other cache call
+    assert cache.get_circuit_breaker().state == cache.CircuitBreaker.OPEN
+
+
+def test_failed_key_delete_is_retried(app, breaker_open):
+    assert cache.delete_cache("service:1") is False
+    assert "service:1" in cache._deferred_deletes[cache.os.getpid()]
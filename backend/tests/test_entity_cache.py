@@ -0,0 +1,76 @@
+import pytest
+import redis
+from app.database import db
+from app.models import Service
+from app.utils.cache import get_cache_backend, get_circuit_breaker
+from app.utils.entity_cache import entity_key, load_entities
+
+
+@pytest.fixture
+def service(app):
+    db.create_all()
+    service = Service(name="Plumbing", price=100.0)
+    db.session.add(service)
+    db.session.commit()
+    yield service
+    db.session.remove()
+    db.drop_all()
+
+
+def _price(service_id):
+    return load_entities({Service: [service_id]})[Service][service_id].price
+
+
+def test_entity_keys_are_namespaced(service):
+    assert entity_key(Service, service.id) == f"ent:service:{service.id}"
+
+
+def test_commit_makes_the_next_read_load_the_row(service):
+    assert _price(service.id) == 100.0
+
+    service.price = 120.0
+    db.session.commit()
+    assert _price(service.id) == 120.0
+
+
+def test_late_fill_of_an_old_row_is_never_served(service):
+    # A reader that loaded the row before the commit stores it afterwards
+    _price(service.id)
+    backend = get_cache_backend(decode_responses=False)
+    stale = backend.get(entity_key(Service, service.id))
+
+    service.price = 120.0
+    db.session.commit()
+    backend.set(entity_key(Service, service.id), stale)
+
+    assert _price(service.id) == 120.0
+
+
+def test_rollback_keeps_the_record(service):
+    _price(service.id)
+
+    service.price = 120.0
+    db.session.flush()
+    db.session.rollback()
+    assert _price(service.id) == 100.0
+
+
+def test_created_row_replaces_a_missing_entry(service):
+    assert load_entities({Service: [service.id + 1]})[Service] == {}
+
+    db.session.add(Service(id=service.id + 1, name="Wiring", price=80.0))
+    db.session.commit()
+    assert _price(service.id + 1) == 80.0
+
+
+def test_changes_made_during_an_outage_are_replayed_before_reads(service):
+    _price(service.id)
+
+    breaker = get_circuit_breaker()
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(redis.ConnectionError("Connection refused"))
+    service.price = 120.0
+    db.session.commit()
+    breaker.record_success()
+
+    assert _price(service.id) == 120.0
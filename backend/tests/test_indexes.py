@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+import pytest
+from flask_migrate import downgrade, stamp, upgrade
+from sqlalchemy import event
+from app import create_app
+from app.database import db
+from app.models import ServiceRequest
+from app.routes.professional import AVAILABLE_REQUESTS
+from app.utils.entity_cache import service_request_page
+from app.utils.pagination import encode_cursor
+from conftest import TestConfig, _reset_cache_state
+
+# The revision before the index migrations
+BEFORE_INDEXES = "e37fd20f5743"
+
+
+# (criteria, index the page should be read from)
+LIST_QUERIES = [
+    ([ServiceRequest.customer_id == 1], "ix_service_request_customer_date_id"),
+    ([ServiceRequest.professional_id == 1], "ix_service_request_professional_date_id"),
+    ([], "ix_service_request_date_id"),
+]
+
+
+@pytest.fixture
+def migrated_app(tmp_path):
+    class MigratedConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'site.db'}"
+
+    _reset_cache_state()
+    app = create_app(MigratedConfig)
+    with app.app_context():
+        # create_app builds the current schema; step back to before the
+        # index migrations so that they are what creates the indexes
+        migrations = os.path.join(app.root_path, os.pardir, "migrations")
+        stamp(directory=migrations)
+        downgrade(directory=migrations, revision=BEFORE_INDEXES)
+        upgrade(directory=migrations)
+        yield app
+        db.session.remove()
+    _reset_cache_state()
+
+
+def _page_plan(criteria, cursor, indexed_by=None):
+    """
+    Run one keyset page and EXPLAIN QUERY PLAN the statement it issued
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        service_request_page(criteria, cursor, 50)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    if indexed_by is not None:
+        statement = statement.replace(
+            "FROM service_request", f"FROM service_request INDEXED BY {indexed_by}", 1
+        )
+    rows = db.session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("cursor", [None, encode_cursor(datetime(2026, 1, 1), 10)])
+@pytest.mark.parametrize("criteria,index", LIST_QUERIES)
+def test_list_pages_read_their_index(migrated_app, criteria, index, cursor):
+    plan = _page_plan(criteria, cursor)
+    assert any(f"USING INDEX {index}" in step for step in plan), plan
+    # The index already returns the rows in page order
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+@pytest.mark.parametrize("cursor", [None, encode_cursor(datetime(2026, 1, 1), 10)])
+def test_unassigned_page_is_an_index_search(migrated_app, cursor):
+    # Without statistics SQLite may read it from either professional index
+    plan = _page_plan(AVAILABLE_REQUESTS, cursor)
+    assert all(step.startswith("SEARCH service_request USING") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_unassigned_index_covers_the_unassigned_query(migrated_app):
+    # SQLite refuses INDEXED BY a partial index whose predicate the query's
+    # WHERE clause does not imply
+    plan = _page_plan(
+        AVAILABLE_REQUESTS, None, indexed_by="ix_service_request_unassigned"
+    )
+    assert not any("TEMP B-TREE" in step for step in plan), plan
@@ -0,0 +1,50 @@
+from app.utils.cache_backends import MemoryBackend, MemoryStore, RedisBackend
+
+
+def test_scan_returns_surviving_keys_once_despite_deletes():
+    backend = MemoryBackend(MemoryStore(), decode_responses=True)
+    keys = [f"service:{i}" for i in range(200)]
+    for key in keys:
+        backend.set(key, b"x")
+
+    seen = []
+    cursor = 0
+    while True:
+        cursor, page = backend.scan(cursor=cursor, count=7)
+        seen.extend(page)
+        # Delete keys the scan already returned, as delete_pattern does
+        backend.delete(*page[:3])
+        if cursor == 0:
+            break
+
+    assert sorted(seen) == sorted(keys)
+
+
+def test_eviction_keeps_pinned_keys():
+    store = MemoryStore(max_keys=10, pinned_prefixes=("cache:version:",))
+    backend = MemoryBackend(store)
+    backend.incr("cache:version:service")
+    for i in range(50):
+        backend.set(f"service:v1:{i}", b"x")
+
+    assert backend.get("cache:version:service") == b"1"
+    assert backend.dbsize() == 10
+
+
+def test_backends_implement_the_interface():
+    # Instantiating fails if an abstract method is left unimplemented
+    MemoryBackend(MemoryStore())
+    RedisBackend()
+
+
+def test_pubsub_accepts_subscriptions_and_stays_silent():
+    backend = MemoryBackend(MemoryStore())
+    pubsub = backend.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{"cache:invalidations": lambda message: None})
+    backend.publish("cache:invalidations", "service")
+
+    assert pubsub.get_message() is None
+    assert list(pubsub.listen()) == []
+    worker = pubsub.run_in_thread(sleep_time=1, daemon=True)
+    worker.stop()
+    pubsub.close()
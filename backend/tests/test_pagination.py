@@ -0,0 +1,39 @@
+from datetime import datetime
+import pytest
+from werkzeug.exceptions import BadRequest
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    page_args,
+)
+
+
+def _page_args(app, query):
+    with app.test_request_context(query_string=query):
+        return page_args()
+
+
+def test_without_parameters_the_list_is_unpaged(app):
+    assert _page_args(app, {}) == (None, None)
+
+
+def test_limit_is_capped(app):
+    assert _page_args(app, {"limit": "10"}) == (None, 10)
+    assert _page_args(app, {"limit": "100000"}) == (None, MAX_PAGE_SIZE)
+
+
+def test_cursor_alone_uses_the_default_limit(app):
+    cursor = encode_cursor(datetime(2026, 1, 1), 10)
+    assert _page_args(app, {"cursor": cursor}) == (cursor, DEFAULT_PAGE_SIZE)
+
+
+@pytest.mark.parametrize("limit", ["abc", "", "1.5", "0", "-3"])
+def test_invalid_limit_is_rejected(app, limit):
+    with pytest.raises(BadRequest):
+        _page_args(app, {"limit": limit})
+
+
+def test_invalid_cursor_is_rejected(app):
+    with pytest.raises(BadRequest):
+        _page_args(app, {"cursor": "not-a-cursor"})